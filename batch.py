@@ -0,0 +1,449 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from langchain_core.runnables import Runnable
+
+from userTranscript import format_transcript
+
+
+logger = logging.getLogger("extraction")
+
+Turn = Tuple[str, str]
+
+
+def load_transcripts(path: str) -> Iterator[Tuple[str, List[Turn]]]:
+    """Lazily yield the transcripts in a JSONL/CSV file or directory; see `ingest.load_transcripts`."""
+    from ingest import load_transcripts as load
+
+    return load(path)
+
+
+@dataclass
+class BatchReport:
+    """Counts and timing for one batch run."""
+
+    succeeded: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def throughput(self) -> float:
+        """Transcripts completed per second."""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.total} transcripts ({self.succeeded} ok, {self.failed} failed) "
+            f"in {self.elapsed:.1f}s, {self.throughput:.2f}/s"
+        )
+
+
+def _result_record(transcript_id: str, message: Any, start: float) -> Dict[str, Any]:
+    record = {
+        "id": transcript_id,
+        "ok": True,
+        "tool_calls": message.tool_calls,
+        "content": message.content,
+        "elapsed": time.perf_counter() - start,
+    }
+    salvaged = message.additional_kwargs.get("salvaged")
+    if salvaged:
+        record["salvaged"] = salvaged
+    failed_windows = message.additional_kwargs.get("failed_windows")
+    if failed_windows:
+        record["failed_windows"] = failed_windows
+    return record
+
+
+def _error_record(transcript_id: str, error: BaseException, start: float) -> Dict[str, Any]:
+    logger.warning(f"Extraction failed for transcript {transcript_id}: {error!r}")
+    record = {
+        "id": transcript_id,
+        "ok": False,
+        "error": repr(error),
+        "elapsed": time.perf_counter() - start,
+    }
+    # BudgetExhaustedError: say which budget ran out (attempts, deadline or tokens).
+    if getattr(error, "reason", None) is not None:
+        record["reason"] = error.reason
+    return record
+
+
+def _prepare(
+    item: Tuple[str, List[Turn]], compact: bool, drop_filler: bool = False
+) -> Tuple[str, dict, Callable[[Any], Any]]:
+    """Parse and format one transcript; returns its ID, the chain input and a result fixer."""
+    from invoke2 import extraction_input
+
+    transcript_id, turns = item
+    if not compact:
+        return transcript_id, extraction_input(format_transcript(turns)), lambda message: message
+    from compaction import compact_transcript, restore_message
+
+    compacted = compact_transcript(turns, drop_filler=drop_filler)
+    return (
+        transcript_id,
+        extraction_input(compacted.text),
+        lambda message: restore_message(message, compacted),
+    )
+
+
+def _item_config(transcript_id: str) -> dict:
+    # The transcript ID names the item's checkpoint thread, so a rerun of the batch
+    # resumes it (only used when the chain was built with a checkpointer).
+    return {"configurable": {"thread_id": transcript_id}}
+
+
+def _extract_chunked(
+    chain: Runnable, item: Tuple[str, List[Turn]], max_tokens: int
+) -> Tuple[str, Any]:
+    """Extract one transcript window by window; see `chunking.extract_chunked`."""
+    from chunking import chunked_message, extract_chunked
+
+    transcript_id, turns = item
+    failures: list = []
+    summary = extract_chunked(
+        chain, turns, max_tokens=max_tokens, config=_item_config(transcript_id), failures=failures
+    )
+    return transcript_id, chunked_message(summary, failures)
+
+
+async def _aextract_chunked(
+    chain: Runnable, item: Tuple[str, List[Turn]], max_tokens: int
+) -> Tuple[str, Any]:
+    """Async counterpart of `_extract_chunked`."""
+    from chunking import aextract_chunked, chunked_message
+
+    transcript_id, turns = item
+    failures: list = []
+    summary = await aextract_chunked(
+        chain, turns, max_tokens=max_tokens, config=_item_config(transcript_id), failures=failures
+    )
+    return transcript_id, chunked_message(summary, failures)
+
+
+def _extract_one(
+    chain: Runnable,
+    item: Tuple[str, List[Turn]],
+    compact: bool = False,
+    drop_filler: bool = False,
+    chunk_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Run one transcript through the chain, turning any failure into an error record.
+
+    ``item`` may be a lazy `ingest.LazyTranscript`; it is parsed and formatted here, in
+    the worker, rather than when it was read from the input.
+    """
+    start = time.perf_counter()
+    transcript_id = getattr(item, "key", None)
+    try:
+        if chunk_tokens:
+            transcript_id, message = _extract_chunked(chain, item, chunk_tokens)
+        else:
+            transcript_id, chain_input, finish = _prepare(item, compact, drop_filler)
+            message = finish(chain.invoke(chain_input, _item_config(transcript_id)))
+    except Exception as e:
+        return _error_record(transcript_id, e, start)
+    return _result_record(transcript_id, message, start)
+
+
+async def _aextract_one(
+    chain: Runnable,
+    item: Tuple[str, List[Turn]],
+    compact: bool = False,
+    drop_filler: bool = False,
+    chunk_tokens: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Async counterpart of `_extract_one`."""
+    start = time.perf_counter()
+    transcript_id = getattr(item, "key", None)
+    try:
+        if chunk_tokens:
+            transcript_id, message = await _aextract_chunked(chain, item, chunk_tokens)
+        else:
+            transcript_id, chain_input, finish = _prepare(item, compact, drop_filler)
+            message = finish(await chain.ainvoke(chain_input, _item_config(transcript_id)))
+    except Exception as e:
+        return _error_record(transcript_id, e, start)
+    return _result_record(transcript_id, message, start)
+
+
+def _record_result(
+    record: Dict[str, Any], output: IO[str], report: "BatchReport", export: Any = None
+) -> None:
+    output.write(json.dumps(record, default=str) + "\n")
+    output.flush()
+    if export is not None:
+        try:
+            export.add_record(record)
+        except Exception as e:
+            # A result that cannot be exported is still in the JSONL output.
+            logger.warning(f"Could not export the result for transcript {record['id']}: {e!r}")
+    if record["ok"]:
+        report.succeeded += 1
+    else:
+        report.failed += 1
+
+
+def run_batch(
+    chain: Runnable,
+    transcripts: Iterable[Tuple[str, List[Turn]]],
+    *,
+    output: IO[str],
+    concurrency: int = 8,
+    compact: bool = False,
+    drop_filler: bool = False,
+    chunk_tokens: Optional[int] = None,
+    export: Any = None,
+) -> BatchReport:
+    """Extract every transcript with at most ``concurrency`` chain calls in flight.
+
+    Transcripts are pulled from the iterable only as slots free up, so arbitrarily large
+    inputs are never fully materialized. Each result is written to ``output`` as one JSON
+    line as soon as it finishes; failures are written as ``{"ok": false, "error": ...}``
+    records and do not stop the batch.
+
+    With ``compact=True`` each transcript is sent in the token-reduced form of
+    `compaction.compact_transcript`, and the returned sources and quotes are mapped back
+    to the original turns. ``drop_filler=True`` also leaves out the turns that are nothing
+    but hesitation sounds (see `compaction.is_filler`).
+
+    With ``chunk_tokens`` set, each transcript is instead split into windows of about that
+    many tokens that are extracted in parallel and merged (see `chunking.extract_chunked`);
+    windows that fail are listed under ``"failed_windows"`` in the record, and the item
+    only fails if every window does.
+
+    With an ``export`` (an `export.ExportWriter`), the summaries of successful results are
+    also streamed into its per-entity tables as they finish; closing it is up to the caller.
+    """
+    report = BatchReport()
+    items = iter(transcripts)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending: Set[Future] = set()
+
+        def submit_next() -> bool:
+            try:
+                item = next(items)
+            except StopIteration:
+                return False
+            pending.add(
+                pool.submit(_extract_one, chain, item, compact, drop_filler, chunk_tokens)
+            )
+            return True
+
+        while len(pending) < concurrency and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                _record_result(future.result(), output, report, export)
+                submit_next()
+    report.elapsed = time.perf_counter() - start
+    logger.info(f"Batch finished: {report}")
+    return report
+
+
+async def arun_batch(
+    chain: Runnable,
+    transcripts: Iterable[Tuple[str, List[Turn]]],
+    *,
+    output: IO[str],
+    concurrency: int = 64,
+    compact: bool = False,
+    drop_filler: bool = False,
+    chunk_tokens: Optional[int] = None,
+    export: Any = None,
+) -> BatchReport:
+    """Like `run_batch`, but drives every extraction from the running event loop.
+
+    The chain is called with ``ainvoke``, so hundreds of requests can be in flight
+    without a thread per request.
+    """
+    report = BatchReport()
+    items = iter(transcripts)
+    start = time.perf_counter()
+    pending: set = set()
+
+    def submit_next() -> bool:
+        try:
+            item = next(items)
+        except StopIteration:
+            return False
+        pending.add(
+            asyncio.ensure_future(_aextract_one(chain, item, compact, drop_filler, chunk_tokens))
+        )
+        return True
+
+    while len(pending) < concurrency and submit_next():
+        pass
+    while pending:
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            pending.discard(task)
+            _record_result(task.result(), output, report, export)
+            submit_next()
+    report.elapsed = time.perf_counter() - start
+    logger.info(f"Batch finished: {report}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract summaries from many transcripts.")
+    parser.add_argument(
+        "input", help="A JSONL or CSV file, or a directory of .json/.jsonl/.csv transcripts."
+    )
+    parser.add_argument("-o", "--output", default="results.jsonl", help="Where to write JSONL results.")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Requests in flight.")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--cache", help="SQLite file to cache validated results in.")
+    parser.add_argument(
+        "--metrics",
+        help="Write graph metrics here when done (.prom/.txt for Prometheus text, else JSON).",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Drive all requests from one event loop instead of a thread pool.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Send compacted transcripts (speaker aliases, merged turns).",
+    )
+    parser.add_argument(
+        "--drop-filler",
+        action="store_true",
+        help="With --compact, leave out turns that are only hesitation sounds (\"um\", \"ehh\").",
+    )
+    parser.add_argument(
+        "--salvage",
+        action="store_true",
+        help="Keep the valid part of extractions that exhaust their retries.",
+    )
+    parser.add_argument(
+        "--sectioned",
+        action="store_true",
+        help="Extract the summary's sections in parallel, each with its own retries.",
+    )
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Split long transcripts into overlapping windows extracted in parallel.",
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=4000,
+        help="With --chunked, the approximate size of each window in tokens.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="SQLite file to checkpoint extractions in; rerunning resumes unfinished items.",
+    )
+    parser.add_argument("--rpm", type=float, help="Client-side limit on model requests per minute.")
+    parser.add_argument("--tpm", type=float, help="Client-side limit on model tokens per minute.")
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Let duplicate transcripts in flight at the same time share one extraction.",
+    )
+    parser.add_argument(
+        "--export-dir",
+        help="Also write the summaries as per-entity tables (Parquet, or JSONL without pyarrow).",
+    )
+    parser.add_argument(
+        "--export-format", choices=("auto", "parquet", "arrow", "jsonl"), default="auto"
+    )
+    args = parser.parse_args(argv)
+    if args.chunked and args.compact:
+        parser.error("--chunked cannot be combined with --compact")
+    chunk_tokens = args.max_tokens if args.chunked else None
+
+    from invoke2 import build_extraction_chain
+    from singleflight import SingleFlight
+
+    cache = None
+    if args.cache:
+        from cache import ExtractionCache
+
+        cache = ExtractionCache(args.cache)
+    metrics = None
+    if args.metrics:
+        from metrics import ExtractionMetrics
+
+        metrics = ExtractionMetrics()
+    checkpointer = None
+    if args.checkpoint:
+        from checkpoint import SqliteCheckpointer
+
+        checkpointer = SqliteCheckpointer(args.checkpoint)
+    rate_limiter = None
+    if args.rpm or args.tpm:
+        from ratelimit import RateLimiter
+
+        rate_limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    chain = build_extraction_chain(
+        max_attempts=args.max_attempts,
+        cache=cache,
+        metrics=metrics,
+        sectioned=args.sectioned,
+        salvage=args.salvage,
+        checkpointer=checkpointer,
+        rate_limiter=rate_limiter,
+        flights=SingleFlight() if args.coalesce else None,
+    )
+    export = None
+    if args.export_dir:
+        from export import ExportWriter
+
+        export = ExportWriter(args.export_dir, args.export_format)
+    with open(args.output, "w", encoding="utf-8") as output:
+        if args.use_async:
+            report = asyncio.run(
+                arun_batch(
+                    chain,
+                    load_transcripts(args.input),
+                    output=output,
+                    concurrency=args.concurrency,
+                    compact=args.compact,
+                    drop_filler=args.drop_filler,
+                    chunk_tokens=chunk_tokens,
+                    export=export,
+                )
+            )
+        else:
+            report = run_batch(
+                chain,
+                load_transcripts(args.input),
+                output=output,
+                concurrency=args.concurrency,
+                compact=args.compact,
+                drop_filler=args.drop_filler,
+                chunk_tokens=chunk_tokens,
+                export=export,
+            )
+    print(report)
+    if export is not None:
+        export.close()
+    if checkpointer is not None:
+        checkpointer.prune()
+        checkpointer.close()
+    if metrics is not None:
+        metrics.write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Offline benchmarks for the validation retry graphs.
+
+Every run uses `ScriptedChatModel`, so the numbers are the overhead `graph.py` and
+`jsonPatch.py` add on top of the model: graph compile time, the latency of each attempt
+(every llm and fallback node run), and the time spent in the validator and in aggregating
+the attempts into a candidate (`AggregationTimer`), for both `bind_validator_with_retries`
+and `bind_validator_with_jsonpatch_retries`, across transcript sizes and retry depths.
+
+    python bench.py --iterations 50 --sizes 20 200 2000 --depths 0 1 2 > bench_output.txt
+"""
+
+import argparse
+import contextlib
+import copy
+import functools
+import json
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+from unittest import mock
+
+import graph
+from graph import bind_validator_with_retries
+from jsonPatch import JsonPatchAggregator, bind_validator_with_jsonpatch_retries
+from metrics import NodeTimer
+from nested import TranscriptSummary
+from scripted_model import ScriptedChatModel, patch_message, tool_call_message
+from userTranscript import format_transcript
+
+
+STRATEGIES = {
+    "default": bind_validator_with_retries,
+    "jsonpatch": bind_validator_with_jsonpatch_retries,
+}
+
+
+def make_transcript(num_turns: int) -> List[Tuple[str, str]]:
+    speakers = ["Pete", "Xu", "Laura"]
+    return [
+        (speakers[i % 3], f"Turn {i}: some thoughts on the beef and where it goes next, part {i}.")
+        for i in range(num_turns)
+    ]
+
+
+def _output(i: int) -> Dict[str, str]:
+    return {"sources": f"Turn {i}: some thoughts on the beef", "content": f"value {i}"}
+
+
+def _moment(i: int) -> Dict[str, Any]:
+    return {"quote": f"quote {i}", "description": f"moment {i}", "expressed_preference": _output(i)}
+
+
+def valid_args(scale: int) -> Dict[str, Any]:
+    """A valid TranscriptSummary payload whose size grows with ``scale``."""
+    return {
+        "metadata": {"title": "Beef", "location": _output(0), "duration": "1h"},
+        "participants": [
+            {
+                "name": _output(i),
+                "role": "guest",
+                "age": 30 + i,
+                "background_details": [{"factoid": _output(i), "professions": ["host"], "why": "context"}],
+            }
+            for i in range(scale)
+        ],
+        "key_moments": [
+            {
+                "topic": f"topic {i}",
+                "happy_moments": [_moment(i), _moment(i + 1)],
+                "tense_moments": [_moment(i + 2)],
+                "sad_moments": [],
+                "moments_summary": f"summary {i}",
+            }
+            for i in range(scale)
+        ],
+        "insightful_quotes": [
+            {"quote": _output(i), "speaker": "Pete", "analysis": f"analysis {i}"} for i in range(scale)
+        ],
+        "overall_summary": "A long discussion. " * scale,
+        "next_steps": [f"step {i}" for i in range(scale)],
+        "other_stuff": [_output(i) for i in range(scale)],
+    }
+
+
+def invalid_args(scale: int) -> Dict[str, Any]:
+    """A payload with two nested errors, both fixable by `fixing_patches`."""
+    args = valid_args(scale)
+    args["key_moments"][-1]["happy_moments"][0]["expressed_preference"] = "liked it"
+    del args["insightful_quotes"][0]["speaker"]
+    return args
+
+
+def fixing_patches(scale: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "op": "replace",
+            "path": f"/key_moments/{scale - 1}/happy_moments/0/expressed_preference",
+            "value": _output(0),
+        },
+        {"op": "add", "path": "/insightful_quotes/0/speaker", "value": "Pete"},
+    ]
+
+
+def non_fixing_patches(scale: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "op": "replace",
+            "path": f"/key_moments/{scale - 1}/happy_moments/0/expressed_preference",
+            "value": "still liked it",
+        }
+    ]
+
+
+def make_script(strategy: str, scale: int, depth: int) -> list:
+    """Responses that validate on attempt ``depth + 1``."""
+    name = TranscriptSummary.__name__
+    if depth == 0:
+        return [tool_call_message(name, valid_args(scale))]
+    if strategy == "jsonpatch":
+        return (
+            [tool_call_message(name, invalid_args(scale))]
+            + [patch_message(non_fixing_patches(scale)) for _ in range(depth - 1)]
+            + [patch_message(fixing_patches(scale))]
+        )
+    return [tool_call_message(name, invalid_args(scale)) for _ in range(depth)] + [
+        tool_call_message(name, valid_args(scale))
+    ]
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Nearest-rank p50/p95/p99 of ``samples``, in milliseconds."""
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        return ordered[index] * 1000
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99)}
+
+
+class AttemptTimer(NodeTimer):
+    """A `NodeTimer` that also keeps the duration of every attempt (llm or fallback run)."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.attempts: List[float] = []
+
+    def on_node_time(self, node: str, seconds: float) -> None:
+        super().on_node_time(node, seconds)
+        if node in ("llm", "fallback"):
+            self.attempts.append(seconds)
+
+
+class AggregationTimer:
+    """Times the aggregation steps the graphs run while `installed`.
+
+    That is `graph._default_aggregator` for the default strategy, and
+    `JsonPatchAggregator.update` / ``result`` for the JSONPatch one, wherever they are
+    called from (the validator, finalizer and salvage nodes).
+    """
+
+    def __init__(self) -> None:
+        self.total = 0.0
+
+    def _timed(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.total += time.perf_counter() - start
+
+        return timed
+
+    @contextlib.contextmanager
+    def installed(self) -> Iterator["AggregationTimer"]:
+        """Time aggregation in the graphs bound (and invoked) inside this block."""
+        with mock.patch.object(
+            graph, "_default_aggregator", self._timed(graph._default_aggregator)
+        ), mock.patch.object(
+            JsonPatchAggregator, "update", self._timed(JsonPatchAggregator.update)
+        ), mock.patch.object(
+            JsonPatchAggregator, "result", self._timed(JsonPatchAggregator.result)
+        ):
+            yield self
+
+
+def run_scenario(
+    strategy: str, num_turns: int, depth: int, iterations: int, validator_mode: str = "default"
+) -> Dict[str, Dict[str, float]]:
+    scale = max(1, num_turns // 10)
+    model = ScriptedChatModel(script=make_script(strategy, scale, depth))
+    bind = STRATEGIES[strategy]
+    messages = [
+        ("system", "Respond directly using the TranscriptSummary function."),
+        ("user", f"<convo>\n{format_transcript(make_transcript(num_turns))}\n</convo>"),
+    ]
+    samples: Dict[str, List[float]] = defaultdict(list)
+    aggregation = AggregationTimer()
+    for _ in range(iterations):
+        with aggregation.installed():
+            start = time.perf_counter()
+            runnable = bind(
+                model,
+                tools=[TranscriptSummary],
+                max_attempts=depth + 1,
+                validator_mode=validator_mode,
+            )
+            samples["compile"].append(time.perf_counter() - start)
+
+            model.reset()
+            timer = AttemptTimer()
+            aggregation.total = 0.0
+            start = time.perf_counter()
+            runnable.invoke(copy.deepcopy(messages), config={"callbacks": [timer]})
+            samples["invoke"].append(time.perf_counter() - start)
+        samples["per_attempt"].extend(timer.attempts)
+        samples["validation"].append(timer.totals["validator"])
+        samples["aggregation"].append(aggregation.total)
+    return {metric: percentiles(values) for metric, values in samples.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000], help="Transcript turns.")
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1, 2], help="Failed attempts before success.")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--validator-mode", default="default", choices=["default", "fast", "fast-raw", "grounded"])
+    parser.add_argument("--json", action="store_true", help="Emit one JSON object per scenario.")
+    args = parser.parse_args(argv)
+
+    if not args.json:
+        print(f"{'strategy':<10} {'turns':>6} {'depth':>5} {'metric':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for strategy in args.strategies:
+        for num_turns in args.sizes:
+            for depth in args.depths:
+                results = run_scenario(strategy, num_turns, depth, args.iterations, args.validator_mode)
+                if args.json:
+                    print(
+                        json.dumps(
+                            {
+                                "strategy": strategy,
+                                "validator_mode": args.validator_mode,
+                                "turns": num_turns,
+                                "depth": depth,
+                                **results,
+                            }
+                        )
+                    )
+                    continue
+                for metric, p in results.items():
+                    print(
+                        f"{strategy:<10} {num_turns:>6} {depth:>5} {metric:<12} "
+                        f"{p['p50']:>9.3f} {p['p95']:>9.3f} {p['p99']:>9.3f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
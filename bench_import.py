@@ -0,0 +1,100 @@
+"""Import-time benchmark for the extraction entry point.
+
+Imports ``extraction``, and separately makes the first real API access, in fresh
+interpreters and reports the median wall time of each. It fails (exit code 1) if the bare
+import loads a heavy dependency or its median exceeds ``--max-ms``, or if the first API
+access loads a module it does not need (the Gemini client, IPython) or its median exceeds
+``--max-first-access-ms``.
+
+    python bench_import.py --runs 10 --max-ms 50 --max-first-access-ms 1500
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+
+# Modules that must only be loaded on first use, never by ``import extraction``.
+HEAVY_MODULES = (
+    "langgraph",
+    "langchain_core",
+    "langchain_google_genai",
+    "jsonpatch",
+    "IPython",
+    "pydantic",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+# Binding a validator needs langgraph, langchain-core, pydantic and jsonpatch, but not the
+# model client (only built by the registry) or IPython (only used by the __main__ demos).
+FIRST_ACCESS_UNNEEDED = ("langchain_google_genai", "IPython")
+
+# Name: (statement, modules it must not load).
+SCENARIOS = {
+    "import extraction": ("import extraction", HEAVY_MODULES),
+    "first API access": (
+        "import extraction; extraction.bind_validator_with_retries",
+        FIRST_ACCESS_UNNEEDED,
+    ),
+}
+
+
+def measure(statement: str, runs: int) -> Dict[str, object]:
+    samples: List[float] = []
+    heavy: List[str] = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"median_ms": statistics.median(samples) * 1000, "max_ms": max(samples) * 1000, "heavy": heavy}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=50.0, help="Budget for the bare import.")
+    parser.add_argument(
+        "--max-first-access-ms",
+        type=float,
+        default=2000.0,
+        help="Budget for the import plus the first API access.",
+    )
+    args = parser.parse_args(argv)
+    budgets = {"import extraction": args.max_ms, "first API access": args.max_first_access_ms}
+
+    failed = False
+    for name, (statement, forbidden) in SCENARIOS.items():
+        result = measure(statement, args.runs)
+        print(
+            f"{name:<20} median {result['median_ms']:8.2f} ms  max {result['max_ms']:8.2f} ms"
+            f"  heavy modules: {', '.join(result['heavy']) or '-'}"
+        )
+        loaded = [m for m in result["heavy"] if m in forbidden]
+        if loaded:
+            print(f"FAIL: '{name}' loaded {loaded}")
+            failed = True
+        if result["median_ms"] > budgets[name]:
+            print(f"FAIL: '{name}' took {result['median_ms']:.2f} ms > {budgets[name]} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
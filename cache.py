@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from langchain_core.messages import AIMessage, AnyMessage, message_to_dict, messages_from_dict
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel
+
+
+logger = logging.getLogger("extraction")
+
+# Binding options that can change the validated result, and so belong in the key.
+RESULT_OPTIONS = ("strategy", "validator_mode", "salvage", "history", "retry_failed_only")
+
+
+def _tool_schema(tool: Any) -> Any:
+    if isinstance(tool, type) and issubclass(tool, BaseModel):
+        return {"name": tool.__name__, "schema": tool.model_json_schema()}
+    return convert_to_openai_tool(tool)
+
+
+def _as_messages(x: Union[Sequence[AnyMessage], PromptValue]) -> List[AnyMessage]:
+    if isinstance(x, PromptValue):
+        return x.to_messages()
+    return list(x)
+
+
+def cache_key(
+    messages: Union[Sequence[AnyMessage], PromptValue],
+    *,
+    tools: list,
+    model_name: str,
+    max_attempts: int,
+    options: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Hash everything that determines an extraction's result.
+
+    That is the rendered prompt, the tool schemas, the model, the retry budget and those
+    of the binding ``options`` listed in `RESULT_OPTIONS` (retry strategy, validator mode,
+    salvage, ...); changing any of them (e.g. editing a field description in `nested.py`)
+    yields a new key. Other options, such as metrics or a rate limiter, are ignored.
+    """
+    payload = {
+        "prompt": [
+            {
+                "type": m.type,
+                "content": m.content,
+                "tool_calls": getattr(m, "tool_calls", None) or [],
+            }
+            for m in _as_messages(messages)
+        ],
+        "tools": [_tool_schema(t) for t in tools],
+        "model": model_name,
+        "max_attempts": max_attempts,
+        "options": {k: options[k] for k in RESULT_OPTIONS if k in (options or {})},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def model_name_of(llm: Any) -> str:
+    """Best-effort model identifier of a chat model, for use in cache keys."""
+    for attr in ("model", "model_name"):
+        name = getattr(llm, attr, None)
+        if isinstance(name, str):
+            return name
+    return type(llm).__name__
+
+
+class ExtractionCache:
+    """A persistent SQLite store of validated extraction results.
+
+    Entries older than ``max_age`` seconds are never served. When ``max_entries`` or
+    ``max_bytes`` is exceeded, the least recently used entries are evicted. The cache is
+    safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str = "extraction_cache.sqlite",
+        *,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS extractions_accessed ON extractions (accessed)"
+        )
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        now = time.time()
+        oldest = now - self.max_age if self.max_age is not None else float("-inf")
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM extractions WHERE key = ? AND created >= ?",
+                (key, oldest),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE extractions SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return messages_from_dict([json.loads(row[0])])[0]
+
+    def put(self, key: str, message: AIMessage) -> None:
+        value = json.dumps(message_to_dict(message), default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.max_age is not None:
+            self._conn.execute(
+                "DELETE FROM extractions WHERE created < ?", (now - self.max_age,)
+            )
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM extractions WHERE key IN ("
+                " SELECT key FROM extractions ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        if self.max_bytes is not None:
+            # Keep the most recently used entries whose running size fits the budget.
+            self._conn.execute(
+                "DELETE FROM extractions WHERE key IN ("
+                " SELECT key FROM ("
+                "  SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS running"
+                "  FROM extractions)"
+                " WHERE running > ?)",
+                (self.max_bytes,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def with_cache(
+    runnable: Runnable[Union[List[AnyMessage], PromptValue], AIMessage],
+    cache: ExtractionCache,
+    *,
+    tools: list,
+    model_name: str,
+    max_attempts: int,
+    options: Optional[Dict[str, Any]] = None,
+) -> Runnable[Union[List[AnyMessage], PromptValue], AIMessage]:
+    """Put ``cache`` in front of a runnable returned by `bind_validator_with_retries`.
+
+    Hits return the stored message without entering the validation graph; misses run the
+    graph and store its final, validated message. Failed extractions are not cached, and
+    neither are salvaged partial results, so a rerun gets another full attempt. Pass the
+    runnable's binding ``options`` (``strategy``, ``validator_mode``, ...) so that chains
+    built differently do not share entries; see `cache_key`.
+    """
+
+    def key_for(x: Union[Sequence[AnyMessage], PromptValue]) -> str:
+        return cache_key(
+            x, tools=tools, model_name=model_name, max_attempts=max_attempts, options=options
+        )
+
+    def cached(x: Union[Sequence[AnyMessage], PromptValue], config) -> AIMessage:
+        key = key_for(x)
+        hit = cache.get(key)
+        if hit is not None:
+            logger.debug(f"Extraction cache hit {key[:12]}")
+            return hit
+        result = runnable.invoke(x, config)
+        if not result.additional_kwargs.get("salvaged"):
+            cache.put(key, result)
+        return result
+
+    async def acached(x: Union[Sequence[AnyMessage], PromptValue], config) -> AIMessage:
+        key = key_for(x)
+        hit = cache.get(key)
+        if hit is not None:
+            logger.debug(f"Extraction cache hit {key[:12]}")
+            return hit
+        result = await runnable.ainvoke(x, config)
+        if not result.additional_kwargs.get("salvaged"):
+            cache.put(key, result)
+        return result
+
+    return RunnableLambda(cached, afunc=acached, name="CachedExtraction")
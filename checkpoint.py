@@ -0,0 +1,96 @@
+import asyncio
+import functools
+import logging
+import sqlite3
+from typing import Any, AsyncIterator, Dict, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError as e:
+    raise ImportError(
+        "The 'langgraph-checkpoint-sqlite' library is required for checkpointed extractions."
+    ) from e
+
+
+logger = logging.getLogger("extraction")
+
+
+class SqliteCheckpointer(SqliteSaver):
+    """A SQLite checkpoint store for the validation graphs, usable from threads and asyncio.
+
+    Pass it as ``checkpointer`` to `graph.bind_validator_with_retries` (or any builder that
+    forwards it) and invoke the chain with ``config={"configurable": {"thread_id": ...}}``,
+    normally the transcript ID. The graph's state is saved after each node, so a rerun with
+    the same thread ID resumes an interrupted extraction from its last completed node, and
+    returns the stored result of one that already finished.
+
+    The database runs in WAL mode with ``synchronous=NORMAL``: a checkpoint is an append
+    to the log without an fsync, which keeps writes off the critical path of each attempt
+    (a crash of the OS, not of the worker, may lose the last few checkpoints). Async
+    callers are served from the default executor, so the same instance can back both
+    `batch.run_batch` and `batch.arun_batch`.
+    """
+
+    def __init__(self, path: str = "extraction_checkpoints.sqlite"):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        super().__init__(conn)
+        self.path = path
+
+    async def _run(self, func: Any, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Any:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Any]:
+        checkpoints = await self._run(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint: Any, metadata: Any, new_versions: Any) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Any, task_id: str, task_path: str = "") -> None:
+        return await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    def prune(self) -> int:
+        """Drop every checkpoint but the latest of each thread; returns how many were dropped.
+
+        The latest checkpoint is all a resume (or a completed thread's stored result)
+        needs, so this keeps the file from growing with the number of attempts.
+        """
+        with self.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM checkpoints WHERE checkpoint_id NOT IN (
+                    SELECT MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id, checkpoint_ns
+                )
+                """
+            )
+            dropped = cur.rowcount
+            cur.execute(
+                """
+                DELETE FROM writes WHERE checkpoint_id NOT IN (
+                    SELECT checkpoint_id FROM checkpoints
+                )
+                """
+            )
+        logger.debug(f"Pruned {dropped} checkpoints from {self.path}")
+        return dropped
+
+    def close(self) -> None:
+        self.conn.close()
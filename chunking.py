@@ -0,0 +1,302 @@
+import logging
+import uuid
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from nested import (
+    BackgroundInfo,
+    KeyMoments,
+    Member,
+    Moment,
+    OutputFormat,
+    TranscriptSummary,
+)
+from userTranscript import format_transcript
+
+
+logger = logging.getLogger("extraction")
+
+Turn = Tuple[str, str]
+T = TypeVar("T")
+
+
+class TurnWindow(NamedTuple):
+    """A contiguous slice of transcript turns, starting at turn index ``start``."""
+
+    start: int
+    turns: List[Turn]
+
+
+class WindowFailure(NamedTuple):
+    """A window whose extraction failed; it covers turns ``start`` to ``end`` (exclusive)."""
+
+    index: int
+    start: int
+    end: int
+    error: BaseException
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting windows."""
+    return max(1, len(text) // 4)
+
+
+def window_turns(
+    turns: Sequence[Turn],
+    *,
+    max_tokens: int = 4000,
+    overlap_turns: int = 2,
+) -> List[TurnWindow]:
+    """Split turns into windows of at most ``max_tokens`` estimated tokens.
+
+    Consecutive windows share their last/first ``overlap_turns`` turns so that moments
+    spanning a boundary are seen whole by at least one window. A single turn larger than
+    the budget gets a window of its own rather than being split mid-sentence.
+    """
+    windows: List[TurnWindow] = []
+    start = 0
+    while start < len(turns):
+        end, used = start, 0
+        while end < len(turns):
+            cost = estimate_tokens(f"{turns[end][0]}: {turns[end][1]}") + 1
+            if end > start and used + cost > max_tokens:
+                break
+            used += cost
+            end += 1
+        windows.append(TurnWindow(start, list(turns[start:end])))
+        if end >= len(turns):
+            break
+        start = max(end - overlap_turns, start + 1)
+    return windows
+
+
+def window_input(window: TurnWindow, index: int, total: int) -> dict:
+    """Build the chain input asking for a partial summary of one window."""
+    return {
+        "messages": [
+            (
+                "user",
+                f"Extract the summary from the following excerpt (part {index + 1} of {total}) of a longer conversation."
+                " Only include information that appears in this excerpt."
+                f"\n\n<convo>\n{format_transcript(window.turns)}\n</convo>"
+                "\n\nRemember to respond using the TranscriptSummary function.",
+            )
+        ]
+    }
+
+
+def summary_from_message(message: AIMessage) -> TranscriptSummary:
+    """Read the TranscriptSummary tool call out of a validated AI message."""
+    for tc in message.tool_calls:
+        if tc["name"] == TranscriptSummary.__name__:
+            return TranscriptSummary.model_validate(tc["args"])
+    logger.debug("No TranscriptSummary tool call in window result; treating it as empty.")
+    return TranscriptSummary()
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join((text or "").casefold().split())
+
+
+def _dedupe(items: Iterable[T], key: Callable[[T], Hashable]) -> List[T]:
+    """Keep the first item for each key, preserving order."""
+    seen: Dict[Hashable, T] = {}
+    for item in items:
+        seen.setdefault(key(item), item)
+    return list(seen.values())
+
+
+def _output_key(o: OutputFormat) -> str:
+    return _norm(o.content)
+
+
+def _background_key(b: BackgroundInfo) -> Tuple[str, str]:
+    return _norm(b.factoid.content), _norm(b.why)
+
+
+def _moment_key(m: Moment) -> str:
+    return _norm(m.quote)
+
+
+def _merge_members(members: List[Member]) -> Member:
+    first = members[0]
+    return Member(
+        name=first.name,
+        role=next((m.role for m in members if m.role not in (None, "Unknown")), first.role),
+        age=next((m.age for m in members if m.age is not None), None),
+        background_details=_dedupe(
+            (b for m in members for b in m.background_details), _background_key
+        ),
+    )
+
+
+def _merge_key_moments(groups: List[KeyMoments]) -> KeyMoments:
+    return KeyMoments(
+        topic=groups[0].topic,
+        happy_moments=_dedupe((m for g in groups for m in g.happy_moments), _moment_key),
+        tense_moments=_dedupe((m for g in groups for m in g.tense_moments), _moment_key),
+        sad_moments=_dedupe((m for g in groups for m in g.sad_moments), _moment_key),
+        background_info=_dedupe((b for g in groups for b in g.background_info), _background_key),
+        moments_summary=" ".join(
+            _dedupe((g.moments_summary for g in groups if g.moments_summary), _norm)
+        ),
+    )
+
+
+def _group(items: Iterable[T], key: Callable[[T], Hashable]) -> List[List[T]]:
+    groups: Dict[Hashable, List[T]] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return list(groups.values())
+
+
+def reduce_summaries(partials: Sequence[TranscriptSummary]) -> TranscriptSummary:
+    """Deterministically merge per-window summaries into one.
+
+    Entities are matched on case/whitespace-normalized text (participant name, key moment
+    topic, quote text, ...) and kept in first-seen window order, so the windows' overlap
+    does not produce duplicates and the same partials always merge to the same result.
+    """
+    return TranscriptSummary(
+        metadata=next((p.metadata for p in partials if p.metadata is not None), None),
+        participants=[
+            _merge_members(g)
+            for g in _group((m for p in partials for m in p.participants), lambda m: _output_key(m.name))
+        ],
+        key_moments=[
+            _merge_key_moments(g)
+            for g in _group((k for p in partials for k in p.key_moments), lambda k: _norm(k.topic))
+        ],
+        insightful_quotes=_dedupe(
+            (q for p in partials for q in p.insightful_quotes),
+            lambda q: _output_key(q.quote),
+        ),
+        overall_summary=" ".join(
+            _dedupe((p.overall_summary for p in partials if p.overall_summary), _norm)
+        ),
+        next_steps=_dedupe((s for p in partials for s in p.next_steps), _norm),
+        other_stuff=_dedupe((o for p in partials for o in p.other_stuff), _output_key),
+    )
+
+
+def _window_config(
+    config: Optional[RunnableConfig], index: int, max_concurrency: Optional[int]
+) -> RunnableConfig:
+    """The config of one window; a checkpoint thread gets a sub-thread per window."""
+    window_config: Dict[str, Any] = {**(config or {}), "max_concurrency": max_concurrency}
+    configurable = window_config.get("configurable") or {}
+    if configurable.get("thread_id") is not None:
+        window_config["configurable"] = {
+            **configurable,
+            "thread_id": f"{configurable['thread_id']}/window-{index}",
+        }
+    return window_config  # type: ignore[return-value]
+
+
+def _merge_windows(
+    windows: Sequence[TurnWindow],
+    results: Sequence[Any],
+    failures: Optional[List[WindowFailure]],
+) -> TranscriptSummary:
+    """Merge the windows that succeeded; record the failed ones, or raise if all failed."""
+    partials: List[TranscriptSummary] = []
+    failed: List[WindowFailure] = []
+    for index, (window, result) in enumerate(zip(windows, results)):
+        if isinstance(result, Exception):
+            end = window.start + len(window.turns)
+            logger.warning(
+                f"Window {index + 1}/{len(windows)} (turns {window.start}-{end - 1}) "
+                f"failed: {result!r}"
+            )
+            failed.append(WindowFailure(index, window.start, end, result))
+        else:
+            partials.append(summary_from_message(result))
+    if not partials and failed:
+        raise failed[0].error
+    if failures is not None:
+        failures.extend(failed)
+    return reduce_summaries(partials)
+
+
+def extract_chunked(
+    chain: Runnable,
+    turns: Sequence[Turn],
+    *,
+    max_tokens: int = 4000,
+    overlap_turns: int = 2,
+    max_concurrency: Optional[int] = None,
+    config: Optional[RunnableConfig] = None,
+    failures: Optional[List[WindowFailure]] = None,
+) -> TranscriptSummary:
+    """Extract a TranscriptSummary by mapping ``chain`` over windows of turns in parallel.
+
+    ``chain`` is the usual ``prompt | bind_validator_with_retries(...)`` chain; each window
+    gets its own retry loop, so a failed validation only resends that window. A window
+    that still fails is left out of the merge, logged and appended to ``failures`` (if
+    given), so the windows already extracted are kept; the first error is raised only if
+    every window fails. A ``thread_id`` in ``config`` becomes one checkpoint thread per
+    window.
+    """
+    windows = window_turns(turns, max_tokens=max_tokens, overlap_turns=overlap_turns)
+    inputs = [window_input(w, i, len(windows)) for i, w in enumerate(windows)]
+    configs = [_window_config(config, i, max_concurrency) for i in range(len(windows))]
+    results = chain.batch(inputs, configs, return_exceptions=True)
+    return _merge_windows(windows, results, failures)
+
+
+async def aextract_chunked(
+    chain: Runnable,
+    turns: Sequence[Turn],
+    *,
+    max_tokens: int = 4000,
+    overlap_turns: int = 2,
+    max_concurrency: Optional[int] = None,
+    config: Optional[RunnableConfig] = None,
+    failures: Optional[List[WindowFailure]] = None,
+) -> TranscriptSummary:
+    """Async counterpart of `extract_chunked`."""
+    windows = window_turns(turns, max_tokens=max_tokens, overlap_turns=overlap_turns)
+    inputs = [window_input(w, i, len(windows)) for i, w in enumerate(windows)]
+    configs = [_window_config(config, i, max_concurrency) for i in range(len(windows))]
+    results = await chain.abatch(inputs, configs, return_exceptions=True)
+    return _merge_windows(windows, results, failures)
+
+
+def chunked_message(
+    summary: TranscriptSummary, failures: Sequence[WindowFailure] = ()
+) -> AIMessage:
+    """Wrap a merged summary in an AI message shaped like the single-call extractor's.
+
+    Failed windows are listed under ``additional_kwargs["failed_windows"]``.
+    """
+    additional_kwargs: Dict[str, Any] = {}
+    if failures:
+        additional_kwargs["failed_windows"] = [
+            {"window": f.index, "turns": [f.start, f.end], "error": repr(f.error)}
+            for f in failures
+        ]
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": TranscriptSummary.__name__,
+                "args": summary.model_dump(mode="json"),
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+            }
+        ],
+        additional_kwargs=additional_kwargs,
+    )
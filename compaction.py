@@ -0,0 +1,206 @@
+import bisect
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from nested import InsightfulQuote, Moment, OutputFormat, TranscriptSummary
+
+
+Turn = Tuple[str, str]
+
+# Hesitation sounds: "eh", "ehhhhhh", "um", "uhh", "hmm", "mhm", "er", "ah", ...
+FILLER_SOUND = re.compile(r"^(e+h+|u+h+|u+m+|h+m+|m+h+m+|e+r+m*|a+h+|o+h+)$", re.IGNORECASE)
+_WORD = re.compile(r"[\w']+")
+
+
+class Segment(NamedTuple):
+    """A run of compact text copied verbatim from one source turn."""
+
+    start: int
+    end: int
+    turn: int
+
+
+class SourceSpan(NamedTuple):
+    """A character range ``[start, end)`` of the text of source turn ``turn``."""
+
+    turn: int
+    start: int
+    end: int
+
+
+def is_filler(text: str) -> bool:
+    """Whether a turn carries no content: nothing but hesitation sounds, e.g. "Um, uhh...".
+
+    Short replies with any other word ("Uh, no.", "Oh yes!", "Um, 2019.") are content.
+    """
+    return all(FILLER_SOUND.match(w) for w in _WORD.findall(text))
+
+
+def speaker_aliases(speakers: Sequence[str]) -> Dict[str, str]:
+    """Map each speaker to a short alias: their initial, numbered if initials collide."""
+    by_initial: Dict[str, List[str]] = {}
+    for speaker in dict.fromkeys(speakers):
+        by_initial.setdefault((speaker[:1] or "?").upper(), []).append(speaker)
+    aliases: Dict[str, str] = {}
+    for initial, names in by_initial.items():
+        for i, name in enumerate(names, start=1):
+            aliases[name] = initial if len(names) == 1 else f"{initial}{i}"
+    return aliases
+
+
+class CompactTranscript:
+    """A token-reduced rendering of a transcript that can be mapped back to its source.
+
+    ``text`` starts with a legend of speaker aliases and has one ``alias: text`` line per
+    run of consecutive turns by the same speaker. Turn texts are copied verbatim, so every
+    span of ``text`` maps back to exact character ranges of the original turns via
+    ``segments``.
+    """
+
+    def __init__(
+        self,
+        turns: Sequence[Turn],
+        text: str,
+        segments: List[Segment],
+        aliases: Dict[str, str],
+        dropped: List[int],
+    ):
+        self.turns = list(turns)
+        self.text = text
+        self.segments = segments
+        self.aliases = aliases
+        self.dropped = dropped
+        self._starts = [s.start for s in segments]
+        self._names = {alias: name for name, alias in aliases.items()}
+
+    def speaker(self, alias: str) -> str:
+        """The full speaker name for ``alias`` (or ``alias`` itself if it is not one)."""
+        return self._names.get(alias.strip(), alias)
+
+    def find(self, span: str) -> Optional[Tuple[int, int]]:
+        """Locate ``span`` in ``text``, exactly or else ignoring case and outer whitespace."""
+        span = span.strip()
+        if not span:
+            return None
+        start = self.text.find(span)
+        if start < 0:
+            start = self.text.lower().find(span.lower())
+        if start < 0:
+            return None
+        return start, start + len(span)
+
+    def locate(self, span: str) -> List[SourceSpan]:
+        """The source turn ranges that ``span`` (a piece of ``text``) was copied from."""
+        found = self.find(span)
+        if found is None:
+            return []
+        start, end = found
+        spans: List[SourceSpan] = []
+        i = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        for segment in self.segments[i:]:
+            if segment.start >= end:
+                break
+            lo, hi = max(start, segment.start), min(end, segment.end)
+            if lo < hi:
+                spans.append(SourceSpan(segment.turn, lo - segment.start, hi - segment.start))
+        return spans
+
+    def source_text(self, span: str, *, with_speakers: bool = True) -> Optional[str]:
+        """The original transcript text behind ``span``, or None if it is not in ``text``."""
+        spans = self.locate(span)
+        if not spans:
+            return None
+        pieces = []
+        for s in spans:
+            speaker, text = self.turns[s.turn]
+            piece = text[s.start : s.end]
+            pieces.append(f"{speaker}: {piece}" if with_speakers else piece)
+        return "\n".join(pieces) if with_speakers else " ".join(pieces)
+
+
+def compact_transcript(
+    turns: Sequence[Turn],
+    *,
+    alias: bool = True,
+    merge: bool = True,
+    drop_filler: bool = False,
+) -> CompactTranscript:
+    """Render ``turns`` compactly for the prompt.
+
+    Args:
+        turns: ``(speaker, text)`` pairs.
+        alias (bool): Replace speaker names by short aliases, declared once in a legend.
+        merge (bool): Join consecutive turns by the same speaker into one line.
+        drop_filler (bool): Leave out turns that are only hesitation sounds ("um",
+            "ehh"); a turn with any other word, like "ehhhhhh not sure", is kept
+            (see `is_filler`).
+
+    Returns:
+        CompactTranscript: The text plus the offset map back to ``turns``.
+    """
+    aliases = speaker_aliases([s for s, _ in turns]) if alias else {s: s for s, _ in turns}
+    parts: List[str] = []
+    segments: List[Segment] = []
+    dropped: List[int] = []
+    offset = 0
+    if alias and aliases:
+        legend = "Speakers: " + ", ".join(f"{a} = {name}" for name, a in aliases.items())
+        parts.append(legend)
+        offset = len(legend)
+    previous: Optional[str] = None
+    for i, (speaker, text) in enumerate(turns):
+        if drop_filler and is_filler(text):
+            dropped.append(i)
+            continue
+        if merge and speaker == previous:
+            prefix = " "
+        else:
+            prefix = ("\n" if parts else "") + f"{aliases[speaker]}: "
+        parts.append(prefix + text)
+        start = offset + len(prefix)
+        offset = start + len(text)
+        segments.append(Segment(start, offset, i))
+        previous = speaker
+    return CompactTranscript(turns, "".join(parts), segments, aliases, dropped)
+
+
+def _restore(value: Any, compacted: CompactTranscript) -> Any:
+    if isinstance(value, list):
+        return [_restore(v, compacted) for v in value]
+    if not isinstance(value, BaseModel):
+        return value
+    update = {
+        name: _restore(getattr(value, name), compacted) for name in type(value).model_fields
+    }
+    if isinstance(value, OutputFormat):
+        update["sources"] = compacted.source_text(value.sources) or value.sources
+    elif isinstance(value, Moment):
+        update["quote"] = compacted.source_text(value.quote, with_speakers=False) or value.quote
+    elif isinstance(value, InsightfulQuote):
+        update["speaker"] = compacted.speaker(value.speaker)
+    return value.model_copy(update=update)
+
+
+def restore_summary(summary: TranscriptSummary, compacted: CompactTranscript) -> TranscriptSummary:
+    """Rewrite a summary extracted from ``compacted.text`` in terms of the original turns.
+
+    Every ``OutputFormat.sources`` and ``Moment.quote`` that can be found in the compact
+    text is replaced by the exact original text it came from (with full speaker names for
+    sources), and aliased ``InsightfulQuote.speaker`` values are expanded. Spans the model
+    did not copy verbatim are left as they are.
+    """
+    return _restore(summary, compacted)
+
+
+def restore_message(message: AIMessage, compacted: CompactTranscript) -> AIMessage:
+    """`restore_summary` applied to every TranscriptSummary tool call in ``message``."""
+    tool_calls = []
+    for tc in message.tool_calls:
+        if tc["name"] == TranscriptSummary.__name__:
+            summary = restore_summary(TranscriptSummary.model_validate(tc["args"]), compacted)
+            tc = {**tc, "args": summary.model_dump(mode="json")}
+        tool_calls.append(tc)
+    return message.model_copy(update={"tool_calls": tool_calls})
@@ -1,4 +1,3 @@
-
 import getpass
 import os
 
@@ -8,4 +7,15 @@ def _set_env(var: str):
         os.environ[var] = getpass.getpass(f"{var}: ")
 
 
-_set_env("GOOGLE_API_KEY")
+def get_env(var: str) -> str:
+    """Return ``var``, loading ``.env`` and then prompting for it on first use.
+
+    Nothing happens at import time, so importing the extraction modules never blocks on
+    a prompt; the prompt only appears when a client that needs the key is created.
+    """
+    if not os.environ.get(var):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    _set_env(var)
+    return os.environ[var]
@@ -0,0 +1,406 @@
+import functools
+import json
+import logging
+import os
+import typing
+from typing import Any, Dict, Iterable, List, Tuple
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from nested import TranscriptSummary
+
+
+logger = logging.getLogger("extraction")
+
+# One table per entity. Child rows carry the ``summary_id`` of their `TranscriptSummary`
+# and their position in its lists; `OutputFormat` fields are inlined as ``<field>_sources``
+# and ``<field>_content`` columns.
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "summaries": [
+        ("summary_id", "string"),
+        ("title", "string"),
+        ("location_sources", "string"),
+        ("location_content", "string"),
+        ("duration", "string"),
+        ("overall_summary", "string"),
+        ("next_steps", "list<string>"),
+    ],
+    "participants": [
+        ("summary_id", "string"),
+        ("participant_index", "int"),
+        ("name_sources", "string"),
+        ("name_content", "string"),
+        ("role", "string"),
+        ("age", "int"),
+    ],
+    "key_moments": [
+        ("summary_id", "string"),
+        ("key_moment_index", "int"),
+        ("topic", "string"),
+        ("moments_summary", "string"),
+    ],
+    "moments": [
+        ("summary_id", "string"),
+        ("key_moment_index", "int"),
+        ("kind", "string"),
+        ("moment_index", "int"),
+        ("quote", "string"),
+        ("description", "string"),
+        ("expressed_preference_sources", "string"),
+        ("expressed_preference_content", "string"),
+    ],
+    # BackgroundInfo of both participants and key moments; ``owner`` says which.
+    "background_info": [
+        ("summary_id", "string"),
+        ("owner", "string"),
+        ("owner_index", "int"),
+        ("background_index", "int"),
+        ("factoid_sources", "string"),
+        ("factoid_content", "string"),
+        ("professions", "list<string>"),
+        ("why", "string"),
+    ],
+    "insightful_quotes": [
+        ("summary_id", "string"),
+        ("quote_index", "int"),
+        ("quote_sources", "string"),
+        ("quote_content", "string"),
+        ("speaker", "string"),
+        ("analysis", "string"),
+    ],
+    "other_stuff": [
+        ("summary_id", "string"),
+        ("item_index", "int"),
+        ("sources", "string"),
+        ("content", "string"),
+    ],
+}
+
+MOMENT_KINDS = ("happy", "tense", "sad")
+FORMATS = ("auto", "parquet", "arrow", "jsonl")
+_SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow", "jsonl": ".jsonl"}
+
+
+_DROP = object()
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _coerce(annotation: Any, value: Any) -> Any:
+    """``value`` validated as ``annotation`` and dumped, keeping whatever parts are valid.
+
+    Models are coerced field by field and lists item by item, so one bad value only drops
+    itself; returns ``_DROP`` when nothing of ``value`` is usable.
+    """
+    adapter = _adapter(annotation)
+    try:
+        return adapter.dump_python(adapter.validate_python(value))
+    except ValidationError:
+        pass
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        annotation, args = args[0], list(typing.get_args(args[0]))
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel) and isinstance(value, dict):
+        coerced = {}
+        for name, field in annotation.model_fields.items():
+            if name in value:
+                item = _coerce(field.annotation, value[name])
+                if item is not _DROP:
+                    coerced[name] = item
+        return coerced
+    if typing.get_origin(annotation) in (list, List) and isinstance(value, list):
+        items = (_coerce(args[0], item) for item in value)
+        return [item for item in items if item is not _DROP]
+    return _DROP
+
+
+def normalize_summary(summary: Any) -> Dict[str, Any]:
+    """The validated values of a `TranscriptSummary`, as plain Python objects.
+
+    Tool call args are what the model sent, not what validation produced (``"35"`` for
+    an ``int`` age, say), so they are validated again here. Salvaged args that no longer
+    validate as a whole are coerced field by field, dropping the values that fail.
+    """
+    if isinstance(summary, BaseModel):
+        return summary.model_dump()
+    try:
+        return TranscriptSummary.model_validate(summary).model_dump()
+    except ValidationError:
+        coerced = _coerce(TranscriptSummary, summary)
+        return coerced if isinstance(coerced, dict) else {}
+
+
+def _items(value: Any) -> List[dict]:
+    # Salvaged extractions may be missing lists, or hold None in them.
+    return [v for v in value if isinstance(v, dict)] if isinstance(value, list) else []
+
+
+def _output_format(value: Any, prefix: str) -> Dict[str, Any]:
+    value = value if isinstance(value, dict) else {}
+    return {f"{prefix}_sources": value.get("sources"), f"{prefix}_content": value.get("content")}
+
+
+def _background_rows(summary_id: str, owner: str, owner_index: int, details: Any) -> List[dict]:
+    return [
+        {
+            "summary_id": summary_id,
+            "owner": owner,
+            "owner_index": owner_index,
+            "background_index": i,
+            **_output_format(d.get("factoid"), "factoid"),
+            "professions": d.get("professions"),
+            "why": d.get("why"),
+        }
+        for i, d in enumerate(_items(details))
+    ]
+
+
+def flatten_summary(summary_id: str, summary: Any) -> Dict[str, List[dict]]:
+    """Split one `TranscriptSummary` (a model or its tool call args) into per-table rows.
+
+    Args:
+        summary_id (str): The ID linking the rows of every table to this summary.
+        summary: A `nested.TranscriptSummary`, or a dict shaped like one; it is
+            normalized with `normalize_summary`. Missing fields, as in salvaged
+            extractions, become nulls.
+
+    Returns:
+        dict: Rows for each table in `TABLES`, keyed by table name.
+    """
+    summary = normalize_summary(summary)
+    metadata = summary.get("metadata") if isinstance(summary.get("metadata"), dict) else {}
+    tables: Dict[str, List[dict]] = {name: [] for name in TABLES}
+    tables["summaries"].append(
+        {
+            "summary_id": summary_id,
+            "title": metadata.get("title"),
+            **_output_format(metadata.get("location"), "location"),
+            "duration": metadata.get("duration"),
+            "overall_summary": summary.get("overall_summary"),
+            "next_steps": summary.get("next_steps"),
+        }
+    )
+    for i, member in enumerate(_items(summary.get("participants"))):
+        tables["participants"].append(
+            {
+                "summary_id": summary_id,
+                "participant_index": i,
+                **_output_format(member.get("name"), "name"),
+                "role": member.get("role"),
+                "age": member.get("age"),
+            }
+        )
+        tables["background_info"] += _background_rows(
+            summary_id, "participant", i, member.get("background_details")
+        )
+    for i, key_moments in enumerate(_items(summary.get("key_moments"))):
+        tables["key_moments"].append(
+            {
+                "summary_id": summary_id,
+                "key_moment_index": i,
+                "topic": key_moments.get("topic"),
+                "moments_summary": key_moments.get("moments_summary"),
+            }
+        )
+        for kind in MOMENT_KINDS:
+            for j, moment in enumerate(_items(key_moments.get(f"{kind}_moments"))):
+                tables["moments"].append(
+                    {
+                        "summary_id": summary_id,
+                        "key_moment_index": i,
+                        "kind": kind,
+                        "moment_index": j,
+                        "quote": moment.get("quote"),
+                        "description": moment.get("description"),
+                        **_output_format(moment.get("expressed_preference"), "expressed_preference"),
+                    }
+                )
+        tables["background_info"] += _background_rows(
+            summary_id, "key_moment", i, key_moments.get("background_info")
+        )
+    for i, quote in enumerate(_items(summary.get("insightful_quotes"))):
+        tables["insightful_quotes"].append(
+            {
+                "summary_id": summary_id,
+                "quote_index": i,
+                **_output_format(quote.get("quote"), "quote"),
+                "speaker": quote.get("speaker"),
+                "analysis": quote.get("analysis"),
+            }
+        )
+    for i, item in enumerate(_items(summary.get("other_stuff"))):
+        tables["other_stuff"].append(
+            {
+                "summary_id": summary_id,
+                "item_index": i,
+                "sources": item.get("sources"),
+                "content": item.get("content"),
+            }
+        )
+    return tables
+
+
+def _arrow_schema(pa: Any, columns: List[Tuple[str, str]]) -> Any:
+    types = {"string": pa.string(), "int": pa.int64(), "list<string>": pa.list_(pa.string())}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+class ExportWriter:
+    """Streams flattened `TranscriptSummary` results into one file per table in ``directory``.
+
+    Rows are buffered per table and written out every ``row_group_size`` rows, so a batch
+    can add results as they finish without holding the export in memory. ``format`` is
+    "parquet" (one row group per flush), "arrow" (an Arrow IPC file, one record batch per
+    flush), "jsonl" (one JSON object per line), or "auto": Parquet when ``pyarrow`` is
+    installed, JSONL otherwise. The files are complete only once `close` has been called.
+
+    Args:
+        directory (str): Created if needed; the files are named after `TABLES`.
+        format (str): One of `FORMATS`.
+        row_group_size (int): Rows buffered per table before they are written.
+    """
+
+    def __init__(self, directory: str, format: str = "auto", row_group_size: int = 10_000):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown export format {format!r}; expected one of {FORMATS}")
+        if row_group_size < 1:
+            raise ValueError("row_group_size must be at least 1")
+        self._pa = None
+        if format != "jsonl":
+            try:
+                import pyarrow
+                import pyarrow.ipc
+                import pyarrow.parquet
+            except ImportError:
+                if format != "auto":
+                    raise ImportError(
+                        f"The 'pyarrow' library is required for {format} exports."
+                    )
+                logger.info("pyarrow is not installed; exporting JSONL instead of Parquet")
+                format = "jsonl"
+            else:
+                self._pa = pyarrow
+                format = "parquet" if format == "auto" else format
+        self.format = format
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.summaries = 0
+        self.rows: Dict[str, int] = {name: 0 for name in TABLES}
+        self._buffers: Dict[str, List[dict]] = {name: [] for name in TABLES}
+        self._writers: Dict[str, Any] = {}
+        self._schemas: Dict[str, Any] = {}
+        os.makedirs(directory, exist_ok=True)
+        for name, columns in TABLES.items():
+            path = self.path(name)
+            if format == "jsonl":
+                self._writers[name] = open(path, "w", encoding="utf-8")
+                continue
+            schema = self._schemas[name] = _arrow_schema(self._pa, columns)
+            if format == "parquet":
+                self._writers[name] = self._pa.parquet.ParquetWriter(path, schema)
+            else:
+                self._writers[name] = self._pa.ipc.new_file(path, schema)
+
+    def path(self, table: str) -> str:
+        """The file that ``table`` is written to."""
+        return os.path.join(self.directory, table + _SUFFIXES[self.format])
+
+    def add(self, summary_id: str, summary: Any) -> None:
+        """Queue the rows of one summary; see `flatten_summary`."""
+        for name, rows in flatten_summary(summary_id, summary).items():
+            buffer = self._buffers[name]
+            buffer += rows
+            if len(buffer) >= self.row_group_size:
+                self._flush(name)
+        self.summaries += 1
+
+    def add_record(self, record: Dict[str, Any]) -> int:
+        """Queue the summaries of one `batch.run_batch` result record; returns how many.
+
+        Failed records are skipped. A record with several TranscriptSummary tool calls gets
+        summary IDs ``<id>/0``, ``<id>/1``, ...; a single one just uses the record's ID.
+        """
+        if not record.get("ok"):
+            return 0
+        calls = [tc for tc in record.get("tool_calls") or [] if tc["name"] == "TranscriptSummary"]
+        for i, call in enumerate(calls):
+            summary_id = str(record["id"]) if len(calls) == 1 else f"{record['id']}/{i}"
+            self.add(summary_id, call["args"])
+        return len(calls)
+
+    def _flush(self, name: str) -> None:
+        rows = self._buffers[name]
+        if not rows:
+            return
+        writer = self._writers[name]
+        if self.format == "jsonl":
+            writer.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+        else:
+            table = self._pa.Table.from_pylist(rows, schema=self._schemas[name])
+            if self.format == "parquet":
+                writer.write_table(table, row_group_size=len(rows))
+            else:
+                writer.write_table(table, max_chunksize=len(rows))
+        self.rows[name] += len(rows)
+        self._buffers[name] = []
+
+    def flush(self) -> None:
+        """Write out every table's buffered rows."""
+        for name in TABLES:
+            self._flush(name)
+
+    def close(self) -> None:
+        """Flush the remaining rows and finish the files."""
+        if not self._writers:
+            return
+        self.flush()
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        logger.info(
+            f"Exported {self.summaries} summaries to {self.directory} ({self.format}): "
+            + ", ".join(f"{n} {name}" for name, n in self.rows.items())
+        )
+
+    def __enter__(self) -> "ExportWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def export_results(
+    records: Iterable[Dict[str, Any]], directory: str, format: str = "auto", **kwargs: Any
+) -> ExportWriter:
+    """Export an existing `batch.run_batch` JSONL output (as parsed records) to ``directory``."""
+    with ExportWriter(directory, format, **kwargs) as writer:
+        for record in records:
+            writer.add_record(record)
+    return writer
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Export batch results to per-entity Parquet, Arrow or JSONL tables."
+    )
+    parser.add_argument("results", help="A JSONL file written by batch.py.")
+    parser.add_argument("directory", help="Where to write the tables.")
+    parser.add_argument("--format", choices=FORMATS, default="auto")
+    parser.add_argument("--row-group-size", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    with open(args.results, encoding="utf-8") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        writer = export_results(
+            records, args.directory, args.format, row_group_size=args.row_group_size
+        )
+    print(f"Exported {writer.summaries} summaries: {writer.rows}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Side-effect-free entry point for transcript extraction.
+
+``import extraction`` loads nothing heavy: langgraph, langchain, the Gemini client and
+jsonpatch are imported only when one of the names below is first accessed, e.g.
+
+    from extraction import build_extraction_chain, TranscriptSummary
+
+Run ``python bench_import.py`` to check that cold-start cost has not regressed.
+"""
+
+import importlib
+from typing import Any, Dict, List, Tuple
+
+
+_EXPORTS: Dict[str, Tuple[str, str]] = {
+    # Schemas
+    "TranscriptSummary": ("nested", "TranscriptSummary"),
+    "TranscriptMetadata": ("nested", "TranscriptMetadata"),
+    "Member": ("nested", "Member"),
+    "KeyMoments": ("nested", "KeyMoments"),
+    "Moment": ("nested", "Moment"),
+    "InsightfulQuote": ("nested", "InsightfulQuote"),
+    "OutputFormat": ("nested", "OutputFormat"),
+    # Validation graphs
+    "RetryStrategy": ("graph", "RetryStrategy"),
+    "BudgetExhaustedError": ("graph", "BudgetExhaustedError"),
+    "bind_validator_with_retries": ("graph", "bind_validator_with_retries"),
+    "bind_validator_with_jsonpatch_retries": ("jsonPatch", "bind_validator_with_jsonpatch_retries"),
+    "bind_streaming_validator": ("streaming", "bind_streaming_validator"),
+    "ExtractorRegistry": ("registry", "ExtractorRegistry"),
+    "get_extractor": ("registry", "get_extractor"),
+    # Running extractions
+    "build_extraction_chain": ("invoke2", "build_extraction_chain"),
+    "extraction_input": ("invoke2", "extraction_input"),
+    "build_sectioned_chain": ("sectioned", "build_sectioned_chain"),
+    "extract_chunked": ("chunking", "extract_chunked"),
+    "aextract_chunked": ("chunking", "aextract_chunked"),
+    "run_batch": ("batch", "run_batch"),
+    "arun_batch": ("batch", "arun_batch"),
+    "load_transcripts": ("ingest", "load_transcripts"),
+    "format_transcript": ("userTranscript", "format_transcript"),
+    "compact_transcript": ("compaction", "compact_transcript"),
+    "restore_summary": ("compaction", "restore_summary"),
+    "salvage": ("salvage", "salvage"),
+    "ExportWriter": ("export", "ExportWriter"),
+    "flatten_summary": ("export", "flatten_summary"),
+    "TurnIndex": ("grounding", "TurnIndex"),
+    "extract_grounded": ("grounding", "extract_grounded"),
+    # Operations
+    "ExtractionCache": ("cache", "ExtractionCache"),
+    "with_cache": ("cache", "with_cache"),
+    "ExtractionMetrics": ("metrics", "ExtractionMetrics"),
+    "SqliteCheckpointer": ("checkpoint", "SqliteCheckpointer"),
+    "RateLimiter": ("ratelimit", "RateLimiter"),
+    "SingleFlight": ("singleflight", "SingleFlight"),
+    "ExtractionService": ("service", "ExtractionService"),
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module_name, attr = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,4 +1,6 @@
+import logging
 import operator
+import time
 import uuid
 from typing import (
     Annotated,
@@ -8,7 +10,9 @@ from typing import (
     List,
     Literal,
     Optional,
+    Protocol,
     Sequence,
+    Tuple,
     Type,
     Union,
 )
@@ -20,19 +24,208 @@ from langchain_core.messages import (
     BaseMessage,
     HumanMessage,
     ToolCall,
+    ToolMessage,
 )
 from langchain_core.prompt_values import PromptValue
 from langchain_core.runnables import (
     Runnable,
+    RunnableConfig,
     RunnableLambda,
 )
+from langchain_core.runnables.config import patch_config
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.v1 import BaseModel as BaseModelV1, ValidationError as ValidationErrorV1
 from typing_extensions import TypedDict
 
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ValidationNode
 
 
+logger = logging.getLogger("extraction")
+
+
+def _inline(func: Callable, name: Optional[str] = None) -> RunnableLambda:
+    """Wrap a cheap synchronous step so that ``ainvoke`` runs it on the event loop.
+
+    A bare function in a runnable sequence becomes a RunnableLambda, which runs sync
+    functions in a thread pool when invoked asynchronously.
+    """
+
+    async def afunc(x: Any) -> Any:
+        return func(x)
+
+    return RunnableLambda(func, afunc=afunc, name=name or func.__name__)
+
+
+class InlineValidationNode(ValidationNode):
+    """A ValidationNode that validates tool calls in the calling thread.
+
+    Validation is CPU-bound, so the thread pool ValidationNode fans out to buys nothing.
+    Running inline also gives the node a native async path that never leaves the event loop.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.afunc = self._afunc
+
+    def _validate_call(self, call: ToolCall) -> ToolMessage:
+        schema = self.schemas_by_name[call["name"]]
+        try:
+            if issubclass(schema, BaseModel):
+                content = schema.model_validate(call["args"]).model_dump_json()
+            elif issubclass(schema, BaseModelV1):
+                content = schema.validate(call["args"]).json()
+            else:
+                raise ValueError(
+                    f"Unsupported schema type: {type(schema)}. Expected BaseModel or BaseModelV1."
+                )
+            return ToolMessage(content=content, name=call["name"], tool_call_id=call["id"])
+        except (ValidationError, ValidationErrorV1) as e:
+            return ToolMessage(
+                content=self._format_error(e, call, schema),
+                name=call["name"],
+                tool_call_id=call["id"],
+                additional_kwargs={"is_error": True},
+            )
+
+    def _func(
+        self, input: Union[List[AnyMessage], Dict[str, Any]], config: RunnableConfig
+    ) -> Any:
+        output_type, message = self._get_message(input)
+        outputs = [self._validate_call(call) for call in message.tool_calls]
+        if output_type == "list":
+            return outputs
+        return {"messages": outputs}
+
+    async def _afunc(
+        self, input: Union[List[AnyMessage], Dict[str, Any]], config: RunnableConfig
+    ) -> Any:
+        return self._func(input, config)
+
+
+def _raw_arguments(message: AIMessage) -> Dict[int, str]:
+    """The provider's unparsed JSON arguments for each tool call, keyed by call index.
+
+    OpenAI-style messages keep them under ``additional_kwargs["tool_calls"]``, and
+    Gemini-style messages keep the (single) call under ``additional_kwargs["function_call"]``.
+    Calls without raw arguments (e.g. ones rebuilt by an aggregator) are left out.
+    """
+    raw_calls = message.additional_kwargs.get("tool_calls") or []
+    by_id = {
+        rc.get("id"): rc.get("function", {}).get("arguments")
+        for rc in raw_calls
+        if isinstance(rc, dict)
+    }
+    function_call = message.additional_kwargs.get("function_call")
+    raw: Dict[int, str] = {}
+    for i, call in enumerate(message.tool_calls):
+        arguments = by_id.get(call["id"])
+        if (
+            arguments is None
+            and function_call
+            and len(message.tool_calls) == 1
+            and function_call.get("name") == call["name"]
+        ):
+            arguments = function_call.get("arguments")
+        if isinstance(arguments, str):
+            raw[i] = arguments
+    return raw
+
+
+class FastValidationNode(InlineValidationNode):
+    """An InlineValidationNode that validates with precompiled pydantic ``TypeAdapter``s.
+
+    A ``TypeAdapter(List[schema])`` is built once per pydantic v2 tool, and every call to
+    that tool in a message is validated in a single pass. If a batch fails, its calls are
+    revalidated one by one so that each gets its own error in the usual format.
+
+    With ``prefer_raw_json=True`` the batch is validated straight from the provider's raw
+    JSON arguments when the message carries them. Chat model integrations have already
+    parsed those into ``args``, and reparsing the JSON measured about twice as slow as
+    validating the parsed dicts, so this only pays off for messages built without ``args``.
+    """
+
+    def __init__(self, *args: Any, prefer_raw_json: bool = False, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.prefer_raw_json = prefer_raw_json
+        self._adapters: Dict[str, TypeAdapter] = {
+            name: TypeAdapter(List[schema])  # type: ignore[valid-type]
+            for name, schema in self.schemas_by_name.items()
+            if issubclass(schema, BaseModel)
+        }
+
+    def _validate_batch(
+        self, name: str, indexes: List[int], message: AIMessage, raw: Dict[int, str]
+    ) -> Optional[List[ToolMessage]]:
+        """Validate the calls to one tool together; None if any of them is invalid."""
+        adapter = self._adapters.get(name)
+        if adapter is None:
+            return None
+        calls = [message.tool_calls[i] for i in indexes]
+        try:
+            if all(i in raw for i in indexes):
+                validated = adapter.validate_json("[" + ",".join(raw[i] for i in indexes) + "]")
+            else:
+                validated = adapter.validate_python([call["args"] for call in calls])
+        except ValidationError:
+            return None
+        return [
+            ToolMessage(content=model.model_dump_json(), name=name, tool_call_id=call["id"])
+            for call, model in zip(calls, validated)
+        ]
+
+    def _func(
+        self, input: Union[List[AnyMessage], Dict[str, Any]], config: RunnableConfig
+    ) -> Any:
+        output_type, message = self._get_message(input)
+        raw = _raw_arguments(message) if self.prefer_raw_json else {}
+        indexes_by_name: Dict[str, List[int]] = {}
+        for i, call in enumerate(message.tool_calls):
+            indexes_by_name.setdefault(call["name"], []).append(i)
+        results: Dict[int, ToolMessage] = {}
+        for name, indexes in indexes_by_name.items():
+            batch = self._validate_batch(name, indexes, message, raw)
+            if batch is None:
+                batch = [self._validate_call(message.tool_calls[i]) for i in indexes]
+            results.update(zip(indexes, batch))
+        outputs = [results[i] for i in range(len(message.tool_calls))]
+        if output_type == "list":
+            return outputs
+        return {"messages": outputs}
+
+
+class RawJSONValidationNode(FastValidationNode):
+    """A `FastValidationNode` that prefers the provider's raw JSON arguments."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("prefer_raw_json", True)
+        super().__init__(*args, **kwargs)
+
+
+VALIDATOR_MODES: Dict[str, Type[InlineValidationNode]] = {
+    "default": InlineValidationNode,
+    "fast": FastValidationNode,
+    "fast-raw": RawJSONValidationNode,
+}
+
+
+def _validation_node(
+    tools: Sequence[Any],
+    *,
+    mode: Literal["default", "fast", "fast-raw", "grounded"] = "default",
+    format_error: Optional[Callable[[BaseException, ToolCall, Type[BaseModel]], str]] = None,
+) -> InlineValidationNode:
+    if mode == "grounded" and mode not in VALIDATOR_MODES:
+        import grounding  # noqa: F401  (registers GroundingValidationNode)
+    if mode not in VALIDATOR_MODES:
+        raise ValueError(
+            f"Unknown validator mode {mode!r}. Expected one of {list(VALIDATOR_MODES)}."
+        )
+    return VALIDATOR_MODES[mode](tools, format_error=format_error)
+
+
 def _default_aggregator(messages: Sequence[AnyMessage]) -> AIMessage:
     for m in messages[::-1]:
         if m.type == "ai":
@@ -40,6 +233,41 @@ def _default_aggregator(messages: Sequence[AnyMessage]) -> AIMessage:
     raise ValueError("No AI message found in the sequence.")
 
 
+class BudgetExhaustedError(ValueError):
+    """The retry loop stopped before producing a valid value.
+
+    ``reason`` is "attempts" (max_attempts reached), "deadline" (the next attempt would
+    not finish before the deadline) or "tokens" (it would exceed the token budget).
+    ``budget`` is the retry budget as it stood when the loop stopped.
+    """
+
+    def __init__(self, reason: str, message: str, budget: Dict[str, Any]):
+        super().__init__(message)
+        self.reason = reason
+        self.budget = budget
+
+
+class IncrementalAggregator(Protocol):
+    """Aggregates the loop's AI messages one attempt at a time.
+
+    The aggregate is kept in graph state between attempts, so ``update`` only sees the
+    messages added since its last call and may mutate the aggregate in place. Keep it
+    plain data (dicts, lists, strings) so that it can be checkpointed.
+    """
+
+    def init(self) -> Any:
+        """Return the aggregate for a loop with no generated messages."""
+        ...
+
+    def update(self, aggregate: Any, messages: Sequence[AnyMessage]) -> Any:
+        """Fold the newly generated ``messages`` into ``aggregate`` and return it."""
+        ...
+
+    def result(self, aggregate: Any) -> AIMessage:
+        """Build the candidate AI message to validate (or return) from ``aggregate``."""
+        ...
+
+
 class RetryStrategy(TypedDict, total=False):
     """The retry strategy for a tool call."""
 
@@ -54,6 +282,26 @@ class RetryStrategy(TypedDict, total=False):
     ]
     """The function to use once validation fails."""
     aggregate_messages: Optional[Callable[[Sequence[AnyMessage]], AIMessage]]
+    incremental_aggregator: Optional[IncrementalAggregator]
+    """Used instead of aggregate_messages inside the loop, so that each attempt only
+    folds in its own messages rather than re-aggregating the whole history."""
+    deadline_seconds: Optional[float]
+    """Wall-clock budget for the whole request. No fallback attempt is started that is
+    not expected (from the average attempt so far) to finish within it."""
+    max_tokens: Optional[int]
+    """Token budget (input + output, from the model's usage metadata) for the whole
+    request. No fallback attempt is started that is expected to exceed it."""
+    salvage: bool
+    """When the budget runs out, return the best value salvageable from the latest
+    candidate (see `salvage.salvage_message`) instead of raising. Defaults to False."""
+    retry_failed_only: bool
+    """Freeze the tool calls that passed validation and ask the fallback to fix only the
+    failed ones; the frozen and repaired calls are merged by ID, and calls the fallback
+    sends again unchanged are dropped in favour of their frozen copy. Defaults to False."""
+    history: Literal["full", "latest"]
+    """Which messages the fallback sees. "full" (default) resends the whole loop history;
+    "latest" sends only the input messages, the latest (aggregated) candidate and the
+    validation errors raised against it, capping per-attempt input tokens."""
 
 
 def _bind_validator_with_retries(
@@ -65,6 +313,9 @@ def _bind_validator_with_retries(
     validator: ValidationNode,
     retry_strategy: RetryStrategy,
     tool_choice: Optional[str] = None,
+    checkpointer: Optional[BaseCheckpointSaver] = None,
+    rate_limiter: Optional[Any] = None,
+    stream_sections: bool = False,
 ) -> Runnable[Union[List[AnyMessage], PromptValue], AIMessage]:
     """Binds a tool validators + retry logic to create a runnable validation graph.
 
@@ -89,7 +340,30 @@ def _bind_validator_with_retries(
             - fallback: The LLM or function to use in case of validation failure.
             - aggregate_messages: A function to aggregate the messages over multiple turns.
                 Defaults to fetching the last AI message.
+            - incremental_aggregator: An `IncrementalAggregator` whose aggregate is carried
+                in graph state, so each attempt only aggregates its new messages.
+            - history: "full" or "latest"; what the fallback is sent. Defaults to "full".
+            - retry_failed_only: Only send the failed tool calls back for repair, keeping
+                the ones that passed. Defaults to False.
+            - deadline_seconds / max_tokens: Per-request wall-clock and token budgets.
+                The fallback can read what remains from
+                ``config["configurable"]["retry_budget"]``.
+            - salvage: Return a partial result, with the dropped paths reported under
+                ``additional_kwargs["salvaged"]``, instead of raising once the budget
+                is exhausted. Defaults to False.
         tool_choice: If provided, always run the validator on the tool output.
+        checkpointer (BaseCheckpointSaver): If provided, invocations whose config has a
+            ``configurable["thread_id"]`` save the graph state after every node. Invoking
+            again with the same thread ID resumes an interrupted run from its last completed
+            node, or returns the stored result of a finished one.
+        rate_limiter (RateLimiter): If provided, every call of the llm and fallback nodes
+            goes through this `ratelimit.RateLimiter`.
+        stream_sections (bool): Stream the llm's generations, validating each top-level
+            tool argument as soon as it is complete and cutting the generation short at the
+            first invalid one (see `streaming.section_streaming`). The fallback is streamed
+            too unless a custom one is given, in which case the first attempt is not cut
+            short, since the fallback repairs it. Read the sections with
+            `streaming.stream_sections`.
 
     Returns:
         Runnable: A runnable that can be invoked with a list of messages and returns a single AI message.
@@ -115,6 +389,12 @@ def _bind_validator_with_retries(
         attempt_number: Annotated[int, operator.add]
         initial_num_messages: int
         input_format: Literal["list", "dict"]
+        aggregate: Any
+        aggregated_upto: int
+        frozen_calls: Dict[str, ToolCall]
+        started_at: float
+        tokens_used: Annotated[int, operator.add]
+        last_attempt_tokens: int
 
     builder = StateGraph(State)
 
@@ -122,35 +402,165 @@ def _bind_validator_with_retries(
         """Get the messages from the state."""
         return x["messages"]
 
-    model = dedict | llm | (lambda msg: {"messages": [msg], "attempt_number": 1})
+    def to_attempt(msg: BaseMessage) -> dict:
+        usage = getattr(msg, "usage_metadata", None) or {}
+        tokens = usage.get("total_tokens", 0)
+        return {
+            "messages": [msg],
+            "attempt_number": 1,
+            "tokens_used": tokens,
+            "last_attempt_tokens": tokens,
+        }
+
+    if stream_sections:
+        from ratelimit import bound_tool_tokens
+        from streaming import aannounce_retry, announce_retry, section_streaming
+
+        tool_tokens = bound_tool_tokens(llm)
+        # A custom fallback (JSONPatch) repairs the first attempt's candidate instead of
+        # regenerating it, so that attempt must not be cut short.
+        regenerates = retry_strategy.get("fallback") is None
+        llm = section_streaming(llm, validator.schemas_by_name, cut_short=regenerates)
+    else:
+        tool_tokens = None
+    if rate_limiter is not None:
+        llm = rate_limiter.wrap(llm, tool_tokens)
+    model = _inline(dedict) | llm | _inline(to_attempt)
     fbrunnable = retry_strategy.get("fallback")
     if fbrunnable is None:
         fb_runnable = llm
-    elif isinstance(fbrunnable, Runnable):
-        fb_runnable = fbrunnable  # type: ignore
     else:
-        fb_runnable = RunnableLambda(fbrunnable)
-    fallback = (
-        dedict | fb_runnable | (lambda msg: {"messages": [msg], "attempt_number": 1})
-    )
+        if isinstance(fbrunnable, Runnable):
+            fb_runnable = fbrunnable  # type: ignore
+        else:
+            fb_runnable = RunnableLambda(fbrunnable)
+        if rate_limiter is not None:
+            fb_runnable = rate_limiter.wrap(fb_runnable)
+    # To support patch-based retries, we need to be able to
+    # aggregate the messages over multiple turns.
+    select_messages = retry_strategy.get("aggregate_messages") or _default_aggregator
+    incremental = retry_strategy.get("incremental_aggregator")
+    history = retry_strategy.get("history", "full")
+    retry_failed_only = retry_strategy.get("retry_failed_only", False)
+
+    def current_candidate(state: State) -> Tuple[AIMessage, dict]:
+        """Aggregate the generated messages; also returns the state update recording it."""
+        num_inputs = state["initial_num_messages"]
+        if incremental is None:
+            return select_messages(state["messages"][num_inputs:]), {}
+        aggregate = state.get("aggregate")
+        if aggregate is None:
+            aggregate = incremental.init()
+        new_messages = state["messages"][state.get("aggregated_upto") or num_inputs :]
+        # Validation results and error prompts carry nothing to aggregate.
+        if any(m.type == "ai" for m in new_messages):
+            aggregate = incremental.update(aggregate, new_messages)
+        return incremental.result(aggregate), {
+            "aggregate": aggregate,
+            "aggregated_upto": len(state["messages"]),
+        }
+
+    def resends_frozen(frozen: Dict[str, ToolCall], tc: ToolCall) -> bool:
+        """Whether ``tc`` repeats a frozen call under the new ID the fallback gave it."""
+        return any(
+            f["name"] == tc["name"] and f["args"] == tc["args"] for f in frozen.values()
+        )
+
+    def with_frozen_calls(state: State, candidate: AIMessage) -> AIMessage:
+        """Merge the frozen tool calls back into the candidate, by ID."""
+        # An incremental aggregate already carries every call, frozen or repaired.
+        frozen = state.get("frozen_calls")
+        if not frozen or incremental is not None:
+            return candidate
+        ids = {tc["id"] for tc in candidate.tool_calls}
+        kept = [tc for tc_id, tc in frozen.items() if tc_id not in ids]
+        repaired = [
+            tc
+            for tc in candidate.tool_calls
+            if tc["id"] in frozen or not resends_frozen(frozen, tc)
+        ]
+        return candidate.model_copy(update={"tool_calls": kept + repaired})
+
+    def repair_instructions(state: State) -> List[HumanMessage]:
+        """Tell the fallback which calls were frozen and which it should fix."""
+        frozen = state.get("frozen_calls")
+        if not retry_failed_only or not frozen:
+            return []
+        failed = []
+        for m in state["messages"][::-1]:
+            if m.type == "ai":
+                break
+            if m.type == "tool" and m.additional_kwargs.get("is_error"):
+                failed.append(m.tool_call_id)
+        return [
+            HumanMessage(
+                content=f"Tool calls {list(frozen)} passed validation and are kept as they are. "
+                f"Respond only with corrections for the failed tool calls {failed[::-1]}."
+            )
+        ]
+
+    def fallback_messages(state: State) -> list:
+        """Get the messages the fallback should see under the history policy."""
+        if history == "full":
+            return state["messages"] + repair_instructions(state)
+        # The state keeps the full history for aggregation; only the fallback's
+        # view is compacted to the inputs, the current candidate and its errors.
+        num_inputs = state["initial_num_messages"]
+        generated = state["messages"][num_inputs:]
+        last_ai = max(i for i, m in enumerate(generated) if m.type == "ai")
+        return (
+            state["messages"][:num_inputs]
+            + [current_candidate(state)[0]]
+            + generated[last_ai + 1 :]
+            + repair_instructions(state)
+        )
+
+    max_attempts = retry_strategy.get("max_attempts", 3)
+    deadline_seconds = retry_strategy.get("deadline_seconds")
+    max_tokens = retry_strategy.get("max_tokens")
+
+    def retry_budget(state: State) -> Dict[str, Any]:
+        """What is left of the request's budget before the next attempt."""
+        elapsed = time.time() - state["started_at"]
+        budget: Dict[str, Any] = {
+            "attempt": state["attempt_number"] + 1,
+            "max_attempts": max_attempts,
+            "elapsed_seconds": elapsed,
+            "tokens_used": state.get("tokens_used", 0),
+        }
+        if deadline_seconds is not None:
+            budget["remaining_seconds"] = deadline_seconds - elapsed
+        if max_tokens is not None:
+            budget["remaining_tokens"] = max_tokens - budget["tokens_used"]
+        return budget
+
+    fallback_chain = _inline(fallback_messages) | fb_runnable | _inline(to_attempt)
+
+    def with_budget(state: State, config: RunnableConfig) -> RunnableConfig:
+        configurable = {**config.get("configurable", {}), "retry_budget": retry_budget(state)}
+        return patch_config(config, configurable=configurable)
+
+    def fallback(state: State, config: RunnableConfig) -> dict:
+        config = with_budget(state, config)
+        if stream_sections:
+            announce_retry(state["messages"], config)
+        return fallback_chain.invoke(state, config)
+
+    async def afallback(state: State, config: RunnableConfig) -> dict:
+        config = with_budget(state, config)
+        if stream_sections:
+            await aannounce_retry(state["messages"], config)
+        return await fallback_chain.ainvoke(state, config)
 
     def count_messages(state: State) -> dict:
-        return {"initial_num_messages": len(state.get("messages", []))}
+        return {
+            "initial_num_messages": len(state.get("messages", [])),
+            "started_at": time.time(),
+        }
 
     builder.add_node("count_messages", count_messages)
     builder.add_node("llm", model)
-    builder.add_node("fallback", fallback)
-
-    # To support patch-based retries, we need to be able to
-    # aggregate the messages over multiple turns.
-    # The next sequence selects only the relevant messages
-    # and then applies the validator
-    select_messages = retry_strategy.get("aggregate_messages") or _default_aggregator
-
-    def select_generated_messages(state: State) -> list:
-        """Select only the messages generated within this loop."""
-        selected = state["messages"][state["initial_num_messages"] :]
-        return [select_messages(selected)]
+    builder.add_node("fallback", RunnableLambda(fallback, afunc=afallback, name="budgeted_fallback"))
 
     def endict_validator_output(x: Sequence[AnyMessage]) -> dict:
         if tool_choice and not x:
@@ -164,27 +574,66 @@ def _bind_validator_with_retries(
             }
         return {"messages": x}
 
-    validator_runnable = select_generated_messages | validator | endict_validator_output
-    builder.add_node("validator", validator_runnable)
+    def unfrozen(state: State, candidate: AIMessage) -> AIMessage:
+        """The part of the candidate that still needs validating."""
+        frozen = state.get("frozen_calls")
+        if not frozen:
+            return candidate
+        return candidate.model_copy(
+            update={
+                "tool_calls": [
+                    tc
+                    for tc in candidate.tool_calls
+                    if tc["id"] not in frozen and not resends_frozen(frozen, tc)
+                ]
+            }
+        )
+
+    def freeze(state: State, checked: AIMessage, results: Sequence[AnyMessage]) -> dict:
+        """Record the calls that passed validation so that later attempts keep them."""
+        if not retry_failed_only:
+            return {}
+        passed = {
+            m.tool_call_id
+            for m in results
+            if m.type == "tool" and not m.additional_kwargs.get("is_error")
+        }
+        frozen = dict(state.get("frozen_calls") or {})
+        frozen.update({tc["id"]: tc for tc in checked.tool_calls if tc["id"] in passed})
+        return {"frozen_calls": frozen}
+
+    # The validator only sees the aggregated candidate (minus any frozen calls), and
+    # records the aggregate it built so the next attempt can start from it.
+    def validate(state: State, config: RunnableConfig) -> dict:
+        candidate, update = current_candidate(state)
+        checked = unfrozen(state, candidate)
+        output = validator.invoke([checked], config)
+        return {**endict_validator_output(output), **update, **freeze(state, checked, output)}
+
+    async def avalidate(state: State, config: RunnableConfig) -> dict:
+        candidate, update = current_candidate(state)
+        checked = unfrozen(state, candidate)
+        output = await validator.ainvoke([checked], config)
+        return {**endict_validator_output(output), **update, **freeze(state, checked, output)}
+
+    builder.add_node("validator", RunnableLambda(validate, afunc=avalidate, name="validate"))
 
     class Finalizer:
         """Pick the final message to return from the retry loop."""
 
-        def __init__(self, aggregator: Optional[Callable[[list], AIMessage]] = None):
-            self._aggregator = aggregator or _default_aggregator
+        def __init__(self, select_candidate: Callable[[State], Tuple[AIMessage, dict]]):
+            self._select_candidate = select_candidate
 
         def __call__(self, state: State) -> dict:
-            """Return just the AI message."""
-            initial_num_messages = state["initial_num_messages"]
-            generated_messages = state["messages"][initial_num_messages:]
+            """Return just the AI message, with any frozen tool calls merged back in."""
             return {
                 "messages": {
-                    "finalize": self._aggregator(generated_messages),
+                    "finalize": with_frozen_calls(state, self._select_candidate(state)[0]),
                 }
             }
 
     # We only want to emit the final message
-    builder.add_node("finalizer", Finalizer(retry_strategy.get("aggregate_messages")))
+    builder.add_node("finalizer", Finalizer(current_candidate))
 
     # Define the connectivity
     builder.add_edge(START, "count_messages")
@@ -197,23 +646,77 @@ def _bind_validator_with_retries(
 
     builder.add_conditional_edges("llm", route_validator, ["validator", END])
     builder.add_edge("fallback", "validator")
-    max_attempts = retry_strategy.get("max_attempts", 3)
+    def check_budget(state: State) -> None:
+        """Raise if another fallback attempt is not allowed or cannot fit the budget."""
+        budget = retry_budget(state)
+        attempts = state["attempt_number"]
+        if attempts >= max_attempts:
+            raise BudgetExhaustedError(
+                "attempts",
+                f"Could not extract a valid value in {max_attempts} attempts.",
+                budget,
+            )
+        remaining_seconds = budget.get("remaining_seconds")
+        expected_seconds = budget["elapsed_seconds"] / attempts
+        if remaining_seconds is not None and remaining_seconds < expected_seconds:
+            raise BudgetExhaustedError(
+                "deadline",
+                f"Could not extract a valid value within the {deadline_seconds}s deadline: "
+                f"{max(remaining_seconds, 0):.2f}s left after {attempts} attempts, and an "
+                f"attempt takes {expected_seconds:.2f}s.",
+                budget,
+            )
+        remaining_tokens = budget.get("remaining_tokens")
+        expected_tokens = state.get("last_attempt_tokens", 0)
+        if remaining_tokens is not None and remaining_tokens < expected_tokens:
+            raise BudgetExhaustedError(
+                "tokens",
+                f"Could not extract a valid value within {max_tokens} tokens: "
+                f"{max(remaining_tokens, 0)} left after {attempts} attempts, and the last "
+                f"attempt used {expected_tokens}.",
+                budget,
+            )
+
+    salvage = retry_strategy.get("salvage", False)
 
     def route_validation(state: State):
-        if state["attempt_number"] > max_attempts:
-            raise ValueError(
-                f"Could not extract a valid value in {max_attempts} attempts."
-            )
         for m in state["messages"][::-1]:
             if m.type == "ai":
                 break
             if m.additional_kwargs.get("is_error"):
+                try:
+                    check_budget(state)
+                except BudgetExhaustedError:
+                    if salvage:
+                        return "salvage"
+                    raise
                 return "fallback"
         return "finalizer"
 
-    builder.add_conditional_edges(
-        "validator", route_validation, ["finalizer", "fallback"]
-    )
+    destinations = ["finalizer", "fallback"]
+    if salvage:
+        from salvage import salvage_message
+
+        def salvage_node(state: State) -> dict:
+            """Return what can be kept of the latest candidate once retries are exhausted."""
+            candidate = with_frozen_calls(state, current_candidate(state)[0])
+            try:
+                if tool_choice and not candidate.tool_calls:
+                    raise ValueError("The latest attempt has no tool call to salvage.")
+                salvaged = salvage_message(candidate, validator.schemas_by_name)
+            except ValueError as e:
+                try:
+                    check_budget(state)
+                except BudgetExhaustedError as exhausted:
+                    raise exhausted from e
+                raise
+            return {"messages": {"finalize": salvaged}}
+
+        builder.add_node("salvage", salvage_node)
+        builder.add_edge("salvage", END)
+        destinations.append("salvage")
+
+    builder.add_conditional_edges("validator", route_validation, destinations)
 
     builder.add_edge("finalizer", END)
 
@@ -231,9 +734,59 @@ def _bind_validator_with_retries(
         """Ensure the output is in the expected format."""
         return x["messages"][-1]
 
-    return (
-        encode | builder.compile().with_config(run_name="ValidationGraph") | decode
-    ).with_config(run_name="ValidateWithRetries")
+    if checkpointer is None:
+        return (
+            _inline(encode)
+            | builder.compile().with_config(run_name="ValidationGraph")
+            | _inline(decode)
+        ).with_config(run_name="ValidateWithRetries")
+
+    graph = builder.compile()
+    durable = builder.compile(checkpointer=checkpointer)
+    # Builders such as the sectioned chain run several graphs per transcript; each keeps
+    # its own thread, named after its tools.
+    namespace = "+".join(sorted(validator.schemas_by_name))
+
+    def durable_config(config: RunnableConfig) -> Optional[RunnableConfig]:
+        configurable = config.get("configurable") or {}
+        thread_id = configurable.get("thread_id")
+        if thread_id is None:
+            return None
+        return patch_config(
+            config,
+            configurable={**configurable, "thread_id": f"{thread_id}/{namespace}"},
+            run_name="ValidationGraph",
+        )
+
+    def run(x: Union[Sequence[AnyMessage], PromptValue], config: RunnableConfig) -> AIMessage:
+        thread_config = durable_config(config)
+        if thread_config is None:
+            return decode(graph.invoke(encode(x), patch_config(config, run_name="ValidationGraph")))
+        snapshot = durable.get_state(thread_config)
+        if snapshot.next:
+            logger.debug(f"Resuming {thread_config['configurable']['thread_id']} at {snapshot.next}")
+            return decode(durable.invoke(None, thread_config))
+        if snapshot.values:
+            return decode(snapshot.values)
+        return decode(durable.invoke(encode(x), thread_config))
+
+    async def arun(
+        x: Union[Sequence[AnyMessage], PromptValue], config: RunnableConfig
+    ) -> AIMessage:
+        thread_config = durable_config(config)
+        if thread_config is None:
+            return decode(
+                await graph.ainvoke(encode(x), patch_config(config, run_name="ValidationGraph"))
+            )
+        snapshot = await durable.aget_state(thread_config)
+        if snapshot.next:
+            logger.debug(f"Resuming {thread_config['configurable']['thread_id']} at {snapshot.next}")
+            return decode(await durable.ainvoke(None, thread_config))
+        if snapshot.values:
+            return decode(snapshot.values)
+        return decode(await durable.ainvoke(encode(x), thread_config))
+
+    return RunnableLambda(run, afunc=arun, name="ValidateWithRetries")
 
 
 def bind_validator_with_retries(
@@ -242,6 +795,16 @@ def bind_validator_with_retries(
     tools: list,
     tool_choice: Optional[str] = None,
     max_attempts: int = 3,
+    history: Literal["full", "latest"] = "full",
+    metrics: Optional[Any] = None,
+    validator_mode: Literal["default", "fast", "fast-raw", "grounded"] = "default",
+    retry_failed_only: bool = False,
+    deadline_seconds: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    salvage: bool = False,
+    checkpointer: Optional[BaseCheckpointSaver] = None,
+    rate_limiter: Optional[Any] = None,
+    stream_sections: bool = False,
 ) -> Runnable[Union[List[AnyMessage], PromptValue], AIMessage]:
     """Binds validators + retry logic ensure validity of generated tool calls.
 
@@ -268,16 +831,62 @@ def bind_validator_with_retries(
             - aggregate_messages: A function to aggregate the messages over multiple turns.
                 Defaults to fetching the last AI message.
         tool_choice: If provided, always run the validator on the tool output.
+        history: "latest" to resend only the inputs, the latest candidate and its errors
+            on each retry instead of the full conversation.
+        metrics (ExtractionMetrics): If provided, record node timings, attempts, token
+            usage and validation error paths for every invocation.
+        validator_mode (str): "fast" to validate with precompiled TypeAdapters, batching
+            the calls to each tool. "fast-raw" to also parse the provider's raw JSON
+            arguments directly when the message carries them (slower when the chat model
+            has already parsed them into ``args``).
+            "grounded" to expand and check transcript citations first (see
+            `grounding.GroundingValidationNode`).
+        retry_failed_only (bool): When a response has several tool calls, keep the ones
+            that passed validation and ask the model to regenerate only the failed ones.
+        deadline_seconds (float): Per-request wall-clock budget. A retry that is not
+            expected to finish in time is not started; `BudgetExhaustedError` is raised.
+        max_tokens (int): Per-request token budget, enforced the same way.
+        salvage (bool): Once the budget is exhausted, return the latest candidate with its
+            invalid list elements dropped and invalid optional fields reset to defaults,
+            listing the dropped JSON Pointers under ``additional_kwargs["salvaged"]``.
+        checkpointer (BaseCheckpointSaver): Save the graph state after every node of
+            invocations that pass a ``thread_id`` (e.g. the transcript ID) in
+            ``config["configurable"]``, so they can be resumed; see
+            `checkpoint.SqliteCheckpointer`.
+        rate_limiter (RateLimiter): Send every model call, first attempts and retries,
+            through this `ratelimit.RateLimiter`, which is meant to be shared by all the
+            extractors using the same provider quota.
+        stream_sections (bool): Stream every generation, first attempts and retries, and
+            publish each top-level tool argument as soon as it validates; the first invalid
+            one ends the generation early and starts the retry. Consume the runnable with
+            `streaming.stream_sections` / `streaming.astream_sections`.
 
     Returns:
         Runnable: A runnable that can be invoked with a list of messages and returns a single AI message.
     """
     bound_llm = llm.bind_tools(tools, tool_choice=tool_choice)
-    retry_strategy = RetryStrategy(max_attempts=max_attempts)
-    validator = ValidationNode(tools)
-    return _bind_validator_with_retries(
+    retry_strategy = RetryStrategy(
+        max_attempts=max_attempts,
+        history=history,
+        retry_failed_only=retry_failed_only,
+        deadline_seconds=deadline_seconds,
+        max_tokens=max_tokens,
+        salvage=salvage,
+    )
+    validator = _validation_node(
+        tools,
+        mode=validator_mode,
+        format_error=metrics.wrap_format_error() if metrics else None,
+    )
+    runnable = _bind_validator_with_retries(
         bound_llm,
         validator=validator,
         tool_choice=tool_choice,
         retry_strategy=retry_strategy,
-    ).with_config(metadata={"retry_strategy": "default"})
\ No newline at end of file
+        checkpointer=checkpointer,
+        rate_limiter=rate_limiter,
+        stream_sections=stream_sections,
+    ).with_config(metadata={"retry_strategy": "default"})
+    if metrics is not None:
+        runnable = runnable.with_config(callbacks=[metrics.callback_handler()])
+    return runnable
\ No newline at end of file
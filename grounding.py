@@ -0,0 +1,263 @@
+import copy
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolCall, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from graph import VALIDATOR_MODES, InlineValidationNode
+from schemas import json_pointer
+
+
+Turn = Tuple[str, str]
+
+CITATION = re.compile(r"T(\d+)(?:\[(\d+):(\d+)\])?")
+CITATIONS = re.compile(r"^\s*T\d+(?:\[\d+:\d+\])?(?:\s*[,;]\s*T\d+(?:\[\d+:\d+\])?)*\s*$")
+_WORD = re.compile(r"\w+")
+
+CITATION_INSTRUCTIONS = (
+    "Every transcript line starts with its turn number, e.g. `T12 Pete: ...`. In `sources`"
+    " and `quote` fields, cite the transcript instead of copying it: `T12` for a whole turn,"
+    " or `T12[5:48]` for characters 5 to 48 of that turn's text (after `Pete: `). Separate"
+    " several citations with commas. Quoted text must appear in the transcript verbatim."
+)
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+
+class TurnIndex:
+    """A word n-gram index over transcript turns, for checking and expanding citations.
+
+    Built once per transcript. ``find`` locates the turns a quoted span appears in by
+    intersecting the postings of its n-grams and confirming the (case, punctuation and
+    whitespace insensitive) match, so it stays fast on long transcripts. ``expand`` turns
+    ``T12[5:48]``-style citations back into text.
+    """
+
+    def __init__(self, turns: Sequence[Turn], n: int = 3):
+        self.turns = list(turns)
+        self.n = n
+        self._speakers = {speaker.casefold() for speaker, _ in self.turns}
+        self._normalized = [" " + " ".join(_tokens(text)) + " " for _, text in self.turns]
+        self._joined = " " + " ".join(" ".join(_tokens(text)) for _, text in self.turns) + " "
+        self._postings: Dict[Tuple[str, ...], Set[int]] = defaultdict(set)
+        for i, (_, text) in enumerate(self.turns):
+            words = _tokens(text)
+            for j in range(len(words) - n + 1):
+                self._postings[tuple(words[j : j + n])].add(i)
+
+    def render(self) -> str:
+        """The transcript with turn numbers, for prompts that ask for citations."""
+        return "\n".join(f"T{i} {speaker}: {text}" for i, (speaker, text) in enumerate(self.turns))
+
+    def _strip_speaker(self, line: str) -> str:
+        speaker, sep, rest = line.partition(":")
+        if sep and speaker.strip().casefold() in self._speakers:
+            return rest
+        return line
+
+    def _find_piece(self, words: List[str]) -> List[int]:
+        if len(words) >= self.n:
+            candidates: Optional[Set[int]] = None
+            for j in range(len(words) - self.n + 1):
+                postings = self._postings.get(tuple(words[j : j + self.n]), set())
+                candidates = postings if candidates is None else candidates & postings
+                if not candidates:
+                    break
+            turns = sorted(candidates or ())
+        else:
+            turns = range(len(self.turns))
+        needle = " " + " ".join(words) + " "
+        return [i for i in turns if needle in self._normalized[i]]
+
+    def find(self, span: str) -> Optional[List[int]]:
+        """The turns ``span`` was quoted from, or None if any part of it is not in the transcript.
+
+        Each line of ``span`` (with an optional ``Speaker:`` prefix) must appear in a turn;
+        a line that runs across turn boundaries is checked against the whole transcript.
+        """
+        found: List[int] = []
+        for line in span.splitlines():
+            words = _tokens(self._strip_speaker(line))
+            if not words:
+                continue
+            turns = self._find_piece(words)
+            if not turns and " " + " ".join(words) + " " not in self._joined:
+                return None
+            found.extend(t for t in turns if t not in found)
+        return found
+
+    def expand(self, citations: str, *, with_speakers: bool = True) -> str:
+        """Replace ``T12[5:48]``-style citations by the text they point at.
+
+        Raises:
+            ValueError: If a citation names a turn or range that does not exist.
+        """
+        pieces = []
+        for match in CITATION.finditer(citations):
+            turn = int(match.group(1))
+            if turn >= len(self.turns):
+                raise ValueError(f"{match.group(0)}: there is no turn {turn}.")
+            speaker, text = self.turns[turn]
+            start, end = match.group(2), match.group(3)
+            if start is not None:
+                start, end = int(start), int(end)
+                if not 0 <= start < end <= len(text):
+                    raise ValueError(
+                        f"{match.group(0)}: turn {turn} has {len(text)} characters."
+                    )
+                text = text[start:end]
+            pieces.append(f"{speaker}: {text}" if with_speakers else text)
+        return "\n".join(pieces) if with_speakers else " ".join(pieces)
+
+
+class GroundingError(ValueError):
+    """Cited or quoted spans of a tool call that are not in the transcript."""
+
+    def __init__(self, problems: List[Tuple[str, str]]):
+        super().__init__(
+            "Unsupported citations or quotes:\n"
+            + "\n".join(f"- {path}: {problem}" for path, problem in problems)
+        )
+        self.problems = problems
+
+
+def _cited_fields(node: Dict[str, Any]) -> List[Tuple[str, bool]]:
+    """The span-holding keys of one args object, and whether to keep speaker names."""
+    fields = []
+    # OutputFormat
+    if isinstance(node.get("sources"), str) and "content" in node:
+        fields.append(("sources", True))
+    # Moment
+    if isinstance(node.get("quote"), str) and "description" in node:
+        fields.append(("quote", False))
+    return fields
+
+
+def ground_args(
+    args: Any, index: TurnIndex, *, check: bool = True
+) -> Tuple[Any, List[Tuple[str, str]]]:
+    """Expand the citations in tool call ``args`` and check every quoted span.
+
+    Returns a copy of ``args`` with citations replaced by transcript text, and the JSON
+    Pointer and problem of each citation that does not resolve or (with ``check``) each
+    verbatim span that is not in the transcript.
+    """
+    args = copy.deepcopy(args)
+    problems: List[Tuple[str, str]] = []
+
+    def visit(node: Any, loc: Tuple[Union[str, int], ...]) -> None:
+        if isinstance(node, list):
+            for i, item in enumerate(node):
+                visit(item, loc + (i,))
+            return
+        if not isinstance(node, dict):
+            return
+        for key, with_speakers in _cited_fields(node):
+            value = node[key]
+            if CITATIONS.match(value):
+                try:
+                    node[key] = index.expand(value, with_speakers=with_speakers)
+                except ValueError as e:
+                    problems.append((json_pointer(loc + (key,)), str(e)))
+            elif check and index.find(value) is None:
+                problems.append((json_pointer(loc + (key,)), f"{value!r} is not in the transcript."))
+        for key, value in node.items():
+            visit(value, loc + (key,))
+
+    visit(args, ())
+    return args, problems
+
+
+class GroundingValidationNode(InlineValidationNode):
+    """Validates tool calls against their schema after grounding them in the transcript.
+
+    The transcript's `TurnIndex` is read from ``config["configurable"]["turn_index"]``.
+    Citations are expanded and verbatim quotes checked before schema validation; any
+    unresolvable citation or unsupported quote fails the call with a `GroundingError`,
+    which the retry loop reports back like any other validation error. Without an index
+    in the config, calls are only schema-validated.
+    """
+
+    def _ground_call(self, call: ToolCall, index: TurnIndex) -> Union[ToolCall, ToolMessage]:
+        args, problems = ground_args(call["args"], index)
+        if problems:
+            return ToolMessage(
+                content=self._format_error(
+                    GroundingError(problems), call, self.schemas_by_name[call["name"]]
+                ),
+                name=call["name"],
+                tool_call_id=call["id"],
+                additional_kwargs={"is_error": True},
+            )
+        return {**call, "args": args}
+
+    def _func(
+        self, input: Union[List[AnyMessage], Dict[str, Any]], config: RunnableConfig
+    ) -> Any:
+        output_type, message = self._get_message(input)
+        index = (config.get("configurable") or {}).get("turn_index")
+        outputs = []
+        for call in message.tool_calls:
+            grounded = self._ground_call(call, index) if index is not None else call
+            if isinstance(grounded, ToolMessage):
+                outputs.append(grounded)
+            else:
+                outputs.append(self._validate_call(grounded))
+        if output_type == "list":
+            return outputs
+        return {"messages": outputs}
+
+
+VALIDATOR_MODES["grounded"] = GroundingValidationNode
+
+
+def expand_citations(message: AIMessage, index: TurnIndex) -> AIMessage:
+    """Replace the citations in every tool call of ``message`` by transcript text."""
+    tool_calls = [
+        {**tc, "args": ground_args(tc["args"], index, check=False)[0]} for tc in message.tool_calls
+    ]
+    return message.model_copy(update={"tool_calls": tool_calls})
+
+
+def with_grounding(runnable: Runnable) -> Runnable:
+    """Expand the citations in ``runnable``'s output with the config's ``turn_index``."""
+
+    def finish(message: AIMessage, config: RunnableConfig) -> AIMessage:
+        index = (config.get("configurable") or {}).get("turn_index")
+        return expand_citations(message, index) if index is not None else message
+
+    def grounded(x: Any, config: RunnableConfig) -> AIMessage:
+        return finish(runnable.invoke(x, config), config)
+
+    async def agrounded(x: Any, config: RunnableConfig) -> AIMessage:
+        return finish(await runnable.ainvoke(x, config), config)
+
+    return RunnableLambda(grounded, afunc=agrounded, name="GroundedExtraction")
+
+
+def grounded_input(index: TurnIndex) -> dict:
+    """Build the chain input for a summary with citations into ``index``'s transcript."""
+    return {
+        "messages": [
+            (
+                "user",
+                "Extract the summary from the following conversation:\n\n"
+                f"<convo>\n{index.render()}\n</convo>\n\n{CITATION_INSTRUCTIONS}"
+                "\n\nRemember to respond using the TranscriptSummary function.",
+            )
+        ]
+    }
+
+
+def extract_grounded(
+    chain: Runnable, turns: Sequence[Turn], config: Optional[RunnableConfig] = None
+) -> AIMessage:
+    """Run a grounded extraction chain (``build_extraction_chain(grounded=True)``) on ``turns``."""
+    index = TurnIndex(turns)
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "turn_index": index}
+    return chain.invoke(grounded_input(index), config)
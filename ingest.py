@@ -0,0 +1,145 @@
+import csv
+import json
+import mmap
+import os
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from userTranscript import format_transcript
+
+
+Turn = Tuple[str, str]
+
+
+def read_turns(payload: Any) -> List[Turn]:
+    """Accept either a bare list of turns or an object with a 'turns'/'transcript' key."""
+    if isinstance(payload, dict):
+        payload = payload.get("turns", payload.get("transcript"))
+    if not isinstance(payload, list):
+        raise ValueError("Expected a list of (speaker, text) turns.")
+    return [(str(speaker), str(text)) for speaker, text in payload]
+
+
+class LazyTranscript:
+    """One JSONL record, parsed only when its ID or turns are first needed.
+
+    Holds a reference to the (memory-mapped) source and the byte range of its line, so
+    a loader can hand out millions of these without reading the records themselves.
+    Unpacks like the ``(transcript_id, turns)`` pairs the batch runners expect, which
+    is where the parsing happens: in the extraction worker.
+    """
+
+    __slots__ = ("key", "_source", "_start", "_end")
+
+    def __init__(self, source: Union[bytes, mmap.mmap], start: int, end: int, key: str):
+        self.key = key
+        self._source = source
+        self._start = start
+        self._end = end
+
+    def record(self) -> Any:
+        return json.loads(self._source[self._start : self._end])
+
+    def _id(self, record: Any) -> str:
+        return str(record.get("id", self.key)) if isinstance(record, dict) else self.key
+
+    @property
+    def id(self) -> str:
+        return self._id(self.record())
+
+    @property
+    def turns(self) -> List[Turn]:
+        return read_turns(self.record())
+
+    @property
+    def formatted(self) -> str:
+        return format_transcript(self.turns)
+
+    def __iter__(self) -> Iterator[Any]:
+        record = self.record()
+        yield self._id(record)
+        yield read_turns(record)
+
+    def __repr__(self) -> str:
+        return f"LazyTranscript({self.key!r}, bytes {self._start}-{self._end})"
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        # The map stays valid after the file is closed, and is released when the
+        # last LazyTranscript referring to it is.
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_jsonl(path: str) -> Iterator[LazyTranscript]:
+    """Yield a `LazyTranscript` per non-blank line of a JSONL file, via a memory map.
+
+    Only line boundaries are scanned here; pages of the file are read by the OS as
+    records are parsed, so memory use does not grow with the file.
+    """
+    source = _map(path)
+    if source is None:
+        return
+    stem = os.path.splitext(os.path.basename(path))[0]
+    start, lineno = 0, 0
+    size = len(source)
+    while start < size:
+        end = source.find(b"\n", start)
+        if end == -1:
+            end = size
+        lineno += 1
+        # Look at the line's head first, so non-blank lines are not copied out of the map.
+        if source[start : min(end, start + 64)].strip() or source[start:end].strip():
+            yield LazyTranscript(source, start, end, f"{stem}:{lineno}")
+        start = end + 1
+
+
+def iter_csv(path: str) -> Iterator[Tuple[str, List[Turn]]]:
+    """Yield ``(transcript_id, turns)`` from a CSV of turns, one transcript at a time.
+
+    The header must name ``speaker`` and ``text`` columns. With an ``id`` column, each
+    run of consecutive rows sharing an ID is one transcript; without one, the whole file
+    is a single transcript named after the file.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        if "speaker" not in fields or "text" not in fields:
+            raise ValueError(f"{path}: expected 'speaker' and 'text' columns, got {fields}.")
+        current: Optional[str] = None
+        turns: List[Turn] = []
+        for row in reader:
+            transcript_id = row.get("id") or stem
+            if transcript_id != current and turns:
+                yield current, turns  # type: ignore[misc]
+                turns = []
+            current = transcript_id
+            turns.append((row["speaker"], row["text"]))
+        if turns:
+            yield current, turns  # type: ignore[misc]
+
+
+def load_transcripts(path: str) -> Iterator[Union[LazyTranscript, Tuple[str, List[Turn]]]]:
+    """Lazily yield the transcripts in ``path``.
+
+    ``path`` is a ``.jsonl`` file (one transcript per line: an object with an optional
+    ``id`` and a ``turns`` or ``transcript`` list of ``[speaker, text]`` pairs), a ``.csv``
+    file (see `iter_csv`), or a directory scanned for ``*.json`` / ``*.jsonl`` / ``*.csv``
+    files in name order, where a ``.json`` file holds one transcript named by its stem.
+    Items unpack to ``(transcript_id, turns)``.
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            full = os.path.join(path, name)
+            if name.endswith((".jsonl", ".csv")):
+                yield from load_transcripts(full)
+            elif name.endswith(".json"):
+                with open(full, encoding="utf-8") as f:
+                    yield os.path.splitext(name)[0], read_turns(json.load(f))
+        return
+    if path.endswith(".csv"):
+        yield from iter_csv(path)
+    else:
+        yield from iter_jsonl(path)
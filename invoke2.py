@@ -1,60 +1,176 @@
 from langchain_core.prompts import ChatPromptTemplate
 from nested import *
 from graph import *
-from langchain_google_genai import ChatGoogleGenerativeAI
-from userTranscript import formatted
-import getpass
-import os
-from dotenv import load_dotenv
+from cache import model_name_of
+from registry import bind_extractor, get_extractor
 
-load_dotenv()
+
+def extraction_input(formatted: str) -> dict:
+    """Build the chain input asking for a summary of one formatted transcript."""
+    return {
+        "messages": [
+            (
+                "user",
+                f"Extract the summary from the following conversation:\n\n<convo>\n{formatted}\n</convo>"
+                "\n\nRemember to respond using the TranscriptSummary function.",
+            )
+        ]
+    }
 
 
-# os.environ[GOOGLE_API_KEY] = getpass.getpass({GOOGLE_API_KEY}: os.loadenv())
+prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", "Respond directly using the TranscriptSummary function."),
+        ("placeholder", "{messages}"),
+    ]
+)
 
-# def _set_env(var: str):
-#     if not os.environ.get(var):
-#         os.environ[var] = getpass.getpass(f"{var}: ")
 
+def build_extraction_chain(
+    llm=None,
+    max_attempts: int = 3,
+    cache=None,
+    metrics=None,
+    model: str = "gemini-1.5-pro",
+    sectioned: bool = False,
+    salvage: bool = False,
+    grounded: bool = False,
+    checkpointer=None,
+    rate_limiter=None,
+    flights=None,
+    strategy: str = "default",
+):
+    """Build the ``prompt | bind_validator_with_retries(...)`` extraction chain.
 
-# _set_env("GOOGLE_API_KEY")
+    Without an explicit ``llm``, the validation graph comes from the shared extractor
+    registry, so it is compiled once per process for ``model`` and these options.
+    If ``cache`` (an `ExtractionCache`) is given, it is consulted before the validation graph.
+    ``metrics`` (an `ExtractionMetrics`) is attached to the validation graph.
+    With ``sectioned=True`` the summary is extracted section by section in parallel
+    (see `sectioned.build_sectioned_chain`), each with its own retry budget.
+    With ``salvage=True`` an extraction that never validates returns the valid part of its
+    last attempt, with the dropped paths under ``additional_kwargs["salvaged"]``.
+    With ``grounded=True`` the model may cite transcript turns instead of copying them, and
+    every citation and quote is checked against the ``turn_index`` in the config (see
+    `grounding.extract_grounded`); the result has the citations expanded.
+    With a ``checkpointer`` (a `checkpoint.SqliteCheckpointer`), invocations that pass a
+    ``thread_id`` in ``config["configurable"]`` can be resumed after a crash.
+    ``rate_limiter`` (a `ratelimit.RateLimiter`) throttles every model call, retries
+    included; without an ``llm``, the registry's limiter for ``model`` is used by default.
+    With ``flights`` (a `singleflight.SingleFlight`), identical requests made while one is
+    running wait for its result instead of running the validation graph themselves.
+    ``strategy`` picks the retry loop: "default" (`bind_validator_with_retries`) or
+    "jsonpatch" (`bind_validator_with_jsonpatch_retries`).
+    """
+    validator_mode = "grounded" if grounded else "default"
+    key_options = {"strategy": strategy, "validator_mode": validator_mode, "salvage": salvage}
+    # Leave the option out when unset, so the registry can apply its own limiter.
+    limits = {"rate_limiter": rate_limiter} if rate_limiter is not None else {}
+    if sectioned:
+        from sectioned import build_sectioned_chain
 
+        chain = build_sectioned_chain(
+            llm,
+            max_attempts=max_attempts,
+            cache=cache,
+            metrics=metrics,
+            model=model,
+            strategy=strategy,
+            salvage=salvage,
+            validator_mode=validator_mode,
+            checkpointer=checkpointer,
+            flights=flights,
+            **limits,
+        )
+        if grounded:
+            from grounding import with_grounding
 
-# print()
-def invokeExtraction():
+            chain = with_grounding(chain)
+        return chain
     tools = [TranscriptSummary]
 
+    if llm is None:
+        bound_llm = get_extractor(
+            tools,
+            model=model,
+            strategy=strategy,
+            max_attempts=max_attempts,
+            metrics=metrics,
+            salvage=salvage,
+            validator_mode=validator_mode,
+            checkpointer=checkpointer,
+            **limits,
+        )
+    else:
+        model = model_name_of(llm)
+        bound_llm = bind_extractor(
+            llm,
+            tools,
+            strategy=strategy,
+            max_attempts=max_attempts,
+            metrics=metrics,
+            salvage=salvage,
+            validator_mode=validator_mode,
+            checkpointer=checkpointer,
+            **limits,
+        )
+    if cache is not None:
+        from cache import with_cache
 
-    llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro", api_key=os.getenv("GOOGLE_API_KEY"))
+        bound_llm = with_cache(
+            bound_llm,
+            cache,
+            tools=tools,
+            model_name=model,
+            max_attempts=max_attempts,
+            options=key_options,
+        )
+    if flights is not None:
+        from singleflight import with_single_flight
+
+        bound_llm = with_single_flight(
+            bound_llm,
+            flights,
+            tools=tools,
+            model_name=model,
+            max_attempts=max_attempts,
+            options=key_options,
+        )
+    if grounded:
+        from grounding import with_grounding
+
+        bound_llm = with_grounding(bound_llm)
+
+    return prompt | bound_llm
 
-    bound_llm = bind_validator_with_retries(
-        llm,
-        tools=tools,
-    )
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", "Respond directly using the TranscriptSummary function."),
-            ("placeholder", "{messages}"),
-        ]
-    )
 
-    chain = prompt | bound_llm
+def print_result(results) -> None:
+    results.pretty_print()
+    for call_id, dropped in results.additional_kwargs.get("salvaged", {}).items():
+        print(f"Salvaged {call_id}; dropped: {', '.join(dropped)}")
+
+
+def invokeExtraction(salvage: bool = False):
+    from userTranscript import formatted
+
+    chain = build_extraction_chain(salvage=salvage)
 
     try:
-        results = chain.invoke(
-            {
-                "messages": [
-                    (
-                        "user",
-                        f"Extract the summary from the following conversation:\n\n<convo>\n{formatted}\n</convo>"
-                        "\n\nRemember to respond using the TranscriptSummary function.",
-                    )
-                ]
-            },
-        )
-        results.pretty_print()
+        print_result(chain.invoke(extraction_input(formatted)))
+    except ValueError as e:
+        print(repr(e))
+
+
+async def ainvokeExtraction(salvage: bool = False):
+    from userTranscript import formatted
+
+    chain = build_extraction_chain(salvage=salvage)
+
+    try:
+        print_result(await chain.ainvoke(extraction_input(formatted)))
     except ValueError as e:
         print(repr(e))
 
 
-invokeExtraction()
\ No newline at end of file
+if __name__ == "__main__":
+    invokeExtraction()
@@ -1,21 +1,147 @@
-from graph import *
+import copy
 import logging
-from IPython.display import Image, display
-from pydantic import BaseModel, Field, field_validator
-from graph import *
-from graph import _bind_validator_with_retries
-from userTranscript import transcript
+from typing import Any, Dict, List, Literal, Optional, Sequence, Type, Union
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, ToolCall
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, Field
+
+from graph import RetryStrategy, _bind_validator_with_retries, _validation_node
+from schemas import schema_index_or_none
 
 
 logger = logging.getLogger("extraction")
 
 
+# The patch schemas are defined once at import time rather than per call, so
+# binding a new extractor does not rebuild (and re-schema) these classes.
+class JsonPatch(BaseModel):
+    """A JSON Patch document represents an operation to be performed on a JSON document.
+
+    Note that the op and path are ALWAYS required. Value is required for ALL operations except 'remove'.
+    Examples:
+
+    \`\`\`json
+    {"op": "add", "path": "/a/b/c", "patch_value": 1}
+    {"op": "replace", "path": "/a/b/c", "patch_value": 2}
+    {"op": "remove", "path": "/a/b/c"}
+    \`\`\`
+    """
+
+    op: Literal["add", "remove", "replace"] = Field(
+        ...,
+        description="The operation to be performed. Must be one of 'add', 'remove', 'replace'.",
+    )
+    path: str = Field(
+        ...,
+        description="A JSON Pointer path that references a location within the target document where the operation is performed.",
+    )
+    value: Any = Field(
+        ...,
+        description="The value to be used within the operation. REQUIRED for 'add', 'replace', and 'test' operations.",
+    )
+
+
+class PatchFunctionParameters(BaseModel):
+    """Respond with all JSONPatch operation to correct validation errors caused by passing in incorrect or incomplete parameters in a previous tool call."""
+
+    tool_call_id: str = Field(
+        ...,
+        description="The ID of the original tool call that generated the error. Must NOT be an ID of a PatchFunctionParameters tool call.",
+    )
+    reasoning: str = Field(
+        ...,
+        description="Think step-by-step, listing each validation error and the"
+        " JSONPatch operation needed to correct it. "
+        "Cite the fields in the JSONSchema you referenced in developing this plan.",
+    )
+    patches: list[JsonPatch] = Field(
+        ...,
+        description="A list of JSONPatch operations to be applied to the previous tool call's response.",
+    )
+
+
+class JsonPatchAggregator:
+    """Resolve `PatchFunctionParameters` calls against the tool calls they correct.
+
+    The aggregate is carried in the retry graph's state, so each attempt applies only the
+    patches it generated instead of replaying every earlier patch from the original call.
+    It is plain data: the first message content, the resolved tool calls keyed by their
+    original ID, and the ID aliases (patch call ID -> original ID) a patch may target.
+    """
+
+    def __init__(self, in_place: bool = True):
+        try:
+            import jsonpatch  # type: ignore[import-untyped]
+        except ImportError:
+            raise ImportError(
+                "The 'jsonpatch' library is required for JSONPatch-based retries."
+            )
+        self._jsonpatch = jsonpatch
+        self.in_place = in_place
+
+    def init(self) -> Dict[str, Any]:
+        return {"content": "", "tool_calls": {}, "aliases": {}}
+
+    def update(self, aggregate: Dict[str, Any], messages: Sequence[AnyMessage]) -> Dict[str, Any]:
+        resolved: Dict[str, ToolCall] = aggregate["tool_calls"]
+        aliases: Dict[str, str] = aggregate["aliases"]
+        for m in messages:
+            if m.type != "ai":
+                continue
+            if not aggregate["content"]:
+                aggregate["content"] = m.content
+            for tc in m.tool_calls:
+                if tc["name"] != PatchFunctionParameters.__name__:
+                    # Copied once, so later patches can be applied in place without
+                    # touching the message stored in the graph state.
+                    resolved[tc["id"]] = {**tc, "args": copy.deepcopy(tc["args"])}
+                    aliases[tc["id"]] = tc["id"]
+                    continue
+                tcid = aliases.get(tc["args"]["tool_call_id"])
+                if tcid is None:
+                    logger.debug(
+                        f"JsonPatch tool call ID {tc['args']['tool_call_id']} not found."
+                        f"Valid tool call IDs: {list(aliases.keys())}"
+                    )
+                    tcid = next(iter(resolved.keys()), None)
+                if tcid is None:
+                    continue
+                orig_tool_call = resolved[tcid]
+                patches = tc["args"].get("patches") or []
+                orig_tool_call["args"] = self._jsonpatch.apply_patch(
+                    orig_tool_call["args"], patches, in_place=self.in_place
+                )
+                orig_tool_call["id"] = tc["id"]
+                aliases[tc["id"]] = tcid
+        return aggregate
+
+    def result(self, aggregate: Dict[str, Any]) -> AIMessage:
+        return AIMessage(
+            content=aggregate["content"],
+            tool_calls=list(aggregate["tool_calls"].values()),
+        )
+
+
 def bind_validator_with_jsonpatch_retries(
     llm: BaseChatModel,
     *,
     tools: list,
     tool_choice: Optional[str] = None,
     max_attempts: int = 3,
+    history: Literal["full", "latest"] = "full",
+    metrics: Optional[Any] = None,
+    in_place_patches: bool = True,
+    validator_mode: Literal["default", "fast", "fast-raw", "grounded"] = "default",
+    retry_failed_only: bool = False,
+    deadline_seconds: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    salvage: bool = False,
+    checkpointer: Optional[Any] = None,
+    rate_limiter: Optional[Any] = None,
+    stream_sections: bool = False,
 ) -> Runnable[Union[List[AnyMessage], PromptValue], AIMessage]:
     """Binds validators + retry logic ensure validity of generated tool calls.
 
@@ -32,139 +158,124 @@ def bind_validator_with_jsonpatch_retries(
         tools (list): The tools to bind to the LLM.
         tool_choice (Optional[str]): The tool choice to use.
         max_attempts (int): The number of attempts to make.
+        history (str): "latest" to send the fallback only the inputs, the patched tool
+            call and its errors instead of every earlier attempt.
+        metrics (ExtractionMetrics): If provided, record node timings, attempts, token
+            usage and validation error paths for every invocation.
+        in_place_patches (bool): Apply each attempt's patches to the resolved arguments in
+            place rather than to a fresh deep copy. Set to False if a patch may fail halfway
+            and the arguments must be left untouched.
+        validator_mode (str): "fast" to validate with precompiled TypeAdapters, batching
+            the calls to each tool. "fast-raw" to also parse the provider's raw JSON
+            arguments directly when the message carries them (slower when the chat model
+            has already parsed them into ``args``).
+            "grounded" to expand and check transcript citations first (see
+            `grounding.GroundingValidationNode`).
+        retry_failed_only (bool): When a response has several tool calls, stop revalidating
+            the ones that passed and ask for patches to the failed ones only.
+        deadline_seconds (float): Per-request wall-clock budget. A retry that is not
+            expected to finish in time is not started; `BudgetExhaustedError` is raised.
+        max_tokens (int): Per-request token budget, enforced the same way.
+        salvage (bool): Once the budget is exhausted, return the latest candidate with its
+            invalid list elements dropped and invalid optional fields reset to defaults,
+            listing the dropped JSON Pointers under ``additional_kwargs["salvaged"]``.
+        checkpointer (BaseCheckpointSaver): Make invocations with a ``thread_id`` resumable;
+            see `bind_validator_with_retries`.
+        rate_limiter (RateLimiter): Send the first attempt and every patch request through
+            this `ratelimit.RateLimiter`.
+        stream_sections (bool): Stream the first attempt, publishing each top-level tool
+            argument as soon as it validates (see `bind_validator_with_retries`). The
+            generation is not cut short at an invalid one, since the patches repair it, and
+            patch requests are not streamed.
 
     Returns:
         Runnable: A runnable that can be invoked with a list of messages and returns a single AI message.
     """
-
-    try:
-        import jsonpatch  # type: ignore[import-untyped]
-    except ImportError:
-        raise ImportError(
-            "The 'jsonpatch' library is required for JSONPatch-based retries."
-        )
-
-    class JsonPatch(BaseModel):
-        """A JSON Patch document represents an operation to be performed on a JSON document.
-
-        Note that the op and path are ALWAYS required. Value is required for ALL operations except 'remove'.
-        Examples:
-
-        \`\`\`json
-        {"op": "add", "path": "/a/b/c", "patch_value": 1}
-        {"op": "replace", "path": "/a/b/c", "patch_value": 2}
-        {"op": "remove", "path": "/a/b/c"}
-        \`\`\`
-        """
-
-        op: Literal["add", "remove", "replace"] = Field(
-            ...,
-            description="The operation to be performed. Must be one of 'add', 'remove', 'replace'.",
-        )
-        path: str = Field(
-            ...,
-            description="A JSON Pointer path that references a location within the target document where the operation is performed.",
-        )
-        value: Any = Field(
-            ...,
-            description="The value to be used within the operation. REQUIRED for 'add', 'replace', and 'test' operations.",
-        )
-
-    class PatchFunctionParameters(BaseModel):
-        """Respond with all JSONPatch operation to correct validation errors caused by passing in incorrect or incomplete parameters in a previous tool call."""
-
-        tool_call_id: str = Field(
-            ...,
-            description="The ID of the original tool call that generated the error. Must NOT be an ID of a PatchFunctionParameters tool call.",
-        )
-        reasoning: str = Field(
-            ...,
-            description="Think step-by-step, listing each validation error and the"
-            " JSONPatch operation needed to correct it. "
-            "Cite the fields in the JSONSchema you referenced in developing this plan.",
-        )
-        patches: list[JsonPatch] = Field(
-            ...,
-            description="A list of JSONPatch operations to be applied to the previous tool call's response.",
-        )
-
+    aggregator = JsonPatchAggregator(in_place=in_place_patches)
     bound_llm = llm.bind_tools(tools, tool_choice=tool_choice)
     fallback_llm = llm.bind_tools([PatchFunctionParameters])
 
     def aggregate_messages(messages: Sequence[AnyMessage]) -> AIMessage:
-        # Get all the AI messages and apply json patches
-        resolved_tool_calls: Dict[Union[str, None], ToolCall] = {}
-        content: Union[str, List[Union[str, dict]]] = ""
-        for m in messages:
-            if m.type != "ai":
-                continue
-            if not content:
-                content = m.content
-            for tc in m.tool_calls:
-                if tc["name"] == PatchFunctionParameters.__name__:
-                    tcid = tc["args"]["tool_call_id"]
-                    if tcid not in resolved_tool_calls:
-                        logger.debug(
-                            f"JsonPatch tool call ID {tc['args']['tool_call_id']} not found."
-                            f"Valid tool call IDs: {list(resolved_tool_calls.keys())}"
-                        )
-                        tcid = next(iter(resolved_tool_calls.keys()), None)
-                    orig_tool_call = resolved_tool_calls[tcid]
-                    current_args = orig_tool_call["args"]
-                    patches = tc["args"].get("patches") or []
-                    orig_tool_call["args"] = jsonpatch.apply_patch(
-                        current_args,
-                        patches,
-                    )
-                    orig_tool_call["id"] = tc["id"]
-                else:
-                    resolved_tool_calls[tc["id"]] = tc.copy()
-        return AIMessage(
-            content=content,
-            tool_calls=list(resolved_tool_calls.values()),
-        )
+        return aggregator.result(aggregator.update(aggregator.init(), messages))
+
+    # Serialize each tool's schema once; retry prompts then only carry the
+    # sub-schemas at the locations that failed validation.
+    schema_indexes = {
+        t.__name__: schema_index_or_none(t) for t in tools if isinstance(t, type)
+    }
 
     def format_exception(error: BaseException, call: ToolCall, schema: Type[BaseModel]):
+        index = schema_indexes.get(call["name"])
+        schema_json = index.for_error(error) if index else schema.schema_json()
         return (
             f"Error:\n\n\`\`\`\n{repr(error)}\n\`\`\`\n"
-            "Expected Parameter Schema:\n\n" + f"\`\`\`json\n{schema.schema_json()}\n\`\`\`\n"
+            "Expected Parameter Schema (keyed by the JSON Pointer of each failing field):\n\n"
+            + f"\`\`\`json\n{schema_json}\n\`\`\`\n"
             f"Please respond with a JSONPatch to correct the error for tool_call_id=[{call['id']}]."
         )
 
-    validator = ValidationNode(
+    validator = _validation_node(
         tools + [PatchFunctionParameters],
-        format_error=format_exception,
+        mode=validator_mode,
+        format_error=metrics.wrap_format_error(format_exception) if metrics else format_exception,
     )
     retry_strategy = RetryStrategy(
         max_attempts=max_attempts,
         fallback=fallback_llm,
         aggregate_messages=aggregate_messages,
+        incremental_aggregator=aggregator,
+        history=history,
+        retry_failed_only=retry_failed_only,
+        deadline_seconds=deadline_seconds,
+        max_tokens=max_tokens,
+        salvage=salvage,
     )
-    return _bind_validator_with_retries(
+    runnable = _bind_validator_with_retries(
         bound_llm,
         validator=validator,
         retry_strategy=retry_strategy,
         tool_choice=tool_choice,
+        checkpointer=checkpointer,
+        rate_limiter=rate_limiter,
+        stream_sections=stream_sections,
     ).with_config(metadata={"retry_strategy": "jsonpatch"})
-
-bound_llm = bind_validator_with_jsonpatch_retries(llm, tools=tools)
+    if metrics is not None:
+        runnable = runnable.with_config(callbacks=[metrics.callback_handler()])
+    return runnable
 
 
-try:
-    display(Image(bound_llm.get_graph().draw_mermaid_png()))
-except Exception:
-    pass
+if __name__ == "__main__":
+    from IPython.display import Image, display
+    from langchain_core.prompts import ChatPromptTemplate
 
+    from nested import TranscriptSummary
+    from registry import default_registry
+    from userTranscript import formatted
 
-chain = prompt | bound_llm
-results = chain.invoke(
-    {
-        "messages": [
-            (
-                "user",
-                f"Extract the summary from the following conversation:\n\n<convo>\n{formatted}\n</convo>",
-            ),
+    llm = default_registry.model("gemini-1.5-pro")
+    tools = [TranscriptSummary]
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", "Respond directly using the TranscriptSummary function."),
+            ("placeholder", "{messages}"),
         ]
-    },
-)
-results.pretty_print()
\ No newline at end of file
+    )
+    bound_llm = bind_validator_with_jsonpatch_retries(llm, tools=tools)
+
+    try:
+        display(Image(bound_llm.get_graph().draw_mermaid_png()))
+    except Exception:
+        pass
+
+    chain = prompt | bound_llm
+    results = chain.invoke(
+        {
+            "messages": [
+                (
+                    "user",
+                    f"Extract the summary from the following conversation:\n\n<convo>\n{formatted}\n</convo>",
+                ),
+            ]
+        },
+    )
+    results.pretty_print()
@@ -2,7 +2,6 @@ from pydantic import BaseModel, Field, field_validator
 # from langchain_anthropic import ChatAnthropic
 from langchain_core.prompts import ChatPromptTemplate
 from graph import *
-from langchain_google_genai import ChatGoogleGenerativeAI
 import getpass
 import os
 
@@ -12,9 +11,6 @@ def _set_env(var: str):
         os.environ[var] = getpass.getpass(f"{var}: ")
 
 
-_set_env("GOOGLE_API_KEY")
-
-
 class Respond(BaseModel):
     """Use to generate the response. Always use when responding to the user"""
 
@@ -33,19 +29,23 @@ class Respond(BaseModel):
 tools = [Respond]
 
 
+if __name__ == "__main__":
+    _set_env("GOOGLE_API_KEY")
+
+    # Or you can use ChatGroq, ChatOpenAI, ChatGoogleGemini, ChatCohere, etc.
+    # See https://python.langchain.com/docs/integrations/chat/ for more info on tool calling
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-# Or you can use ChatGroq, ChatOpenAI, ChatGoogleGemini, ChatCohere, etc.
-# See https://python.langchain.com/docs/integrations/chat/ for more info on tool calling
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro")
-bound_llm = bind_validator_with_retries(llm, tools=tools)
-prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", "Respond directly by calling the Respond function."),
-        ("placeholder", "{messages}"),
-    ]
-)
+    llm = ChatGoogleGenerativeAI(model="gemini-1.5-pro")
+    bound_llm = bind_validator_with_retries(llm, tools=tools)
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", "Respond directly by calling the Respond function."),
+            ("placeholder", "{messages}"),
+        ]
+    )
 
-chain = prompt | bound_llm
+    chain = prompt | bound_llm
 
-results = chain.invoke({"messages": [("user", "Does P = NP?")]})
-results.pretty_print()
\ No newline at end of file
+    results = chain.invoke({"messages": [("user", "Does P = NP?")]})
+    results.pretty_print()
@@ -0,0 +1,276 @@
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import ToolCall
+from langchain_core.outputs import LLMResult
+from pydantic import BaseModel, ValidationError
+
+
+NODES = ("llm", "fallback", "validator", "finalizer")
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def error_path(loc: Sequence[Any]) -> str:
+    """Collapse a pydantic error location into a field path, e.g. ``key_moments[*].topic``.
+
+    List indices are replaced by ``[*]`` so that errors on different elements of the same
+    field are counted together.
+    """
+    path = ""
+    for part in loc:
+        if isinstance(part, int):
+            path += "[*]"
+        else:
+            path += f".{part}" if path else str(part)
+    return path or "<root>"
+
+
+def _default_format_error(error: BaseException, call: ToolCall, schema: Type[BaseModel]) -> str:
+    return f"{repr(error)}\n\nRespond after fixing all validation errors."
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(b): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Times each validation-graph node run and reports it to `on_node_time`."""
+
+    def __init__(self) -> None:
+        self.totals: Dict[str, float] = defaultdict(float)
+        self._starts: Dict[UUID, Tuple[str, float]] = {}
+
+    def on_node_time(self, node: str, seconds: float) -> None:
+        self.totals[node] += seconds
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # Nested runnables inherit the node's metadata; only time the node run itself.
+        if node in NODES and kwargs.get("name") == node:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def _stop(self, run_id: UUID) -> None:
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            node, start = started
+            self.on_node_time(node, time.perf_counter() - start)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._stop(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._stop(run_id)
+
+
+class ExtractionMetrics:
+    """Operational metrics for the ValidationGraph, safe to share across threads.
+
+    Collects per-node wall time (llm, fallback, validator, finalizer), attempts used per
+    request, input/output tokens from the model's usage metadata (split by node), and a
+    count of validation errors by field path. Attach it with ``metrics=`` on
+    `bind_validator_with_retries` / `bind_validator_with_jsonpatch_retries`, then export
+    with `to_json` or `to_prometheus`.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self.node_seconds: Dict[str, _Histogram] = {}
+        self.attempts: Counter = Counter()
+        self.requests = 0
+        self.failures = 0
+        self.tokens: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.error_paths: Counter = Counter()
+
+    # Recording
+
+    def record_node_time(self, node: str, seconds: float) -> None:
+        with self._lock:
+            if node not in self.node_seconds:
+                self.node_seconds[node] = _Histogram(self._buckets)
+            self.node_seconds[node].observe(seconds)
+
+    def record_request(self, attempts: Optional[int], *, failed: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            if failed:
+                self.failures += 1
+            if attempts is not None:
+                self.attempts[attempts] += 1
+
+    def record_usage(self, node: str, usage: Dict[str, Any]) -> None:
+        with self._lock:
+            self.tokens[(node, "input")] += usage.get("input_tokens", 0)
+            self.tokens[(node, "output")] += usage.get("output_tokens", 0)
+
+    def record_validation_error(self, error: BaseException) -> None:
+        if isinstance(error, ValidationError):
+            paths = [error_path(d.get("loc", ())) for d in error.errors()]
+        else:
+            paths = [f"<{type(error).__name__}>"]
+        with self._lock:
+            self.error_paths.update(paths)
+
+    def wrap_format_error(
+        self,
+        format_error: Optional[Callable[[BaseException, ToolCall, Type[BaseModel]], str]] = None,
+    ) -> Callable[[BaseException, ToolCall, Type[BaseModel]], str]:
+        """Wrap a ValidationNode ``format_error`` so every validation error is counted."""
+        format_error = format_error or _default_format_error
+
+        def counted(error: BaseException, call: ToolCall, schema: Type[BaseModel]) -> str:
+            self.record_validation_error(error)
+            return format_error(error, call, schema)
+
+        return counted
+
+    def callback_handler(self) -> "MetricsCallbackHandler":
+        return MetricsCallbackHandler(self)
+
+    # Export
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "failures": self.failures,
+                "node_seconds": {n: h.to_dict() for n, h in self.node_seconds.items()},
+                "attempts": {str(k): v for k, v in sorted(self.attempts.items())},
+                "tokens": {f"{node}.{kind}": v for (node, kind), v in sorted(self.tokens.items())},
+                "validation_errors": dict(self.error_paths.most_common()),
+            }
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "extraction") -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+
+        def label(value: Any) -> str:
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        lines: List[str] = []
+        with self._lock:
+            lines += [
+                f"# TYPE {prefix}_requests_total counter",
+                f"{prefix}_requests_total {self.requests}",
+                f"# TYPE {prefix}_failures_total counter",
+                f"{prefix}_failures_total {self.failures}",
+                f"# TYPE {prefix}_node_seconds histogram",
+            ]
+            for node, h in sorted(self.node_seconds.items()):
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'{prefix}_node_seconds_bucket{{node="{node}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_node_seconds_bucket{{node="{node}",le="+Inf"}} {h.count}')
+                lines.append(f'{prefix}_node_seconds_sum{{node="{node}"}} {h.sum}')
+                lines.append(f'{prefix}_node_seconds_count{{node="{node}"}} {h.count}')
+            lines.append(f"# TYPE {prefix}_attempts_total counter")
+            for attempts, count in sorted(self.attempts.items()):
+                lines.append(f'{prefix}_attempts_total{{attempts="{attempts}"}} {count}')
+            lines.append(f"# TYPE {prefix}_tokens_total counter")
+            for (node, kind), count in sorted(self.tokens.items()):
+                lines.append(f'{prefix}_tokens_total{{node="{node}",kind="{kind}"}} {count}')
+            lines.append(f"# TYPE {prefix}_validation_errors_total counter")
+            for path, count in self.error_paths.most_common():
+                lines.append(f'{prefix}_validation_errors_total{{path="{label(path)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write the metrics to ``path``: Prometheus text for ``.prom``/``.txt``, else JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                f.write(self.to_json(indent=2))
+
+
+class MetricsCallbackHandler(NodeTimer):
+    """Feeds node timings, token usage and per-request attempts into `ExtractionMetrics`."""
+
+    def __init__(self, metrics: ExtractionMetrics):
+        super().__init__()
+        self.metrics = metrics
+        self._graph_runs: set = set()
+        self._model_nodes: Dict[UUID, str] = {}
+
+    def on_node_time(self, node: str, seconds: float) -> None:
+        self.metrics.record_node_time(node, seconds)
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        if kwargs.get("name") == "ValidationGraph":
+            self._graph_runs.add(run_id)
+        super().on_chain_start(serialized, inputs, run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._graph_runs:
+            self._graph_runs.discard(run_id)
+            attempts = outputs.get("attempt_number") if isinstance(outputs, dict) else None
+            self.metrics.record_request(attempts)
+        super().on_chain_end(outputs, run_id=run_id, **kwargs)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._graph_runs:
+            self._graph_runs.discard(run_id)
+            self.metrics.record_request(None, failed=True)
+        super().on_chain_error(error, run_id=run_id, **kwargs)
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._model_nodes[run_id] = (metadata or {}).get("langgraph_node", "unknown")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        node = self._model_nodes.pop(run_id, "unknown")
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.metrics.record_usage(node, usage)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._model_nodes.pop(run_id, None)
@@ -1,6 +1,5 @@
 from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
-from userTranscript import transcript
 
 
 
@@ -102,62 +102,68 @@ class TranscriptSummary(BaseModel):
     )
 
 
-# Create default data for each model
-metadata = TranscriptMetadata(
-    title="Sample Transcript Title",
-    location=OutputFormat(sources="Source 1", content="Location 1"),
-    duration="1 hour"
-)
-
-participants = [
-    Member(
-        name=OutputFormat(sources="Source 2", content="John Doe"),
-        role="Interviewee",
-        age=30,
-        background_details=[
-            BackgroundInfo(
-                factoid=OutputFormat(sources="Source 3", content="Key Fact"),
-                professions=["Engineer"],
-                why="Relevant to the interview topic"
-            )
+def sample_summary() -> TranscriptSummary:
+    """Build a TranscriptSummary filled with placeholder data."""
+    # Create default data for each model
+    metadata = TranscriptMetadata(
+        title="Sample Transcript Title",
+        location=OutputFormat(sources="Source 1", content="Location 1"),
+        duration="1 hour"
+    )
+
+    participants = [
+        Member(
+            name=OutputFormat(sources="Source 2", content="John Doe"),
+            role="Interviewee",
+            age=30,
+            background_details=[
+                BackgroundInfo(
+                    factoid=OutputFormat(sources="Source 3", content="Key Fact"),
+                    professions=["Engineer"],
+                    why="Relevant to the interview topic"
+                )
+            ]
+        )
+    ]
+
+    key_moments = [
+        KeyMoments(
+            topic="Project Milestones",
+            happy_moments=[
+                Moment(
+                    quote="This was a great success!",
+                    description="Discussing the project launch.",
+                    expressed_preference=OutputFormat(sources="Source 4", content="Positive Feedback")
+                )
+            ],
+            moments_summary="Key highlights and milestones."
+        )
+    ]
+
+    insightful_quotes = [
+        InsightfulQuote(
+            quote=OutputFormat(sources="Source 5", content="Key quote about teamwork."),
+            speaker="Jane Smith",
+            analysis="Highlights the importance of collaboration."
+        )
+    ]
+
+    # Create the final TranscriptSummary
+    return TranscriptSummary(
+        metadata=metadata,
+        participants=participants,
+        key_moments=key_moments,
+        insightful_quotes=insightful_quotes,
+        overall_summary="This is a summary of the interview.",
+        next_steps=["Follow up with participants", "Plan next meeting"],
+        other_stuff=[
+            OutputFormat(sources="Source 6", content="Additional context.")
         ]
     )
-]
-
-key_moments = [
-    KeyMoments(
-        topic="Project Milestones",
-        happy_moments=[
-            Moment(
-                quote="This was a great success!",
-                description="Discussing the project launch.",
-                expressed_preference=OutputFormat(sources="Source 4", content="Positive Feedback")
-            )
-        ],
-        moments_summary="Key highlights and milestones."
-    )
-]
-
-insightful_quotes = [
-    InsightfulQuote(
-        quote=OutputFormat(sources="Source 5", content="Key quote about teamwork."),
-        speaker="Jane Smith",
-        analysis="Highlights the importance of collaboration."
-    )
-]
-
-# Create the final TranscriptSummary
-transcript_summary = TranscriptSummary(
-    metadata=metadata,
-    participants=participants,
-    key_moments=key_moments,
-    insightful_quotes=insightful_quotes,
-    overall_summary="This is a summary of the interview.",
-    next_steps=["Follow up with participants", "Plan next meeting"],
-    other_stuff=[
-        OutputFormat(sources="Source 6", content="Additional context.")
-    ]
-)
 
-# Serialize and print JSON
-print(transcript_summary.json(indent=2))
+
+if __name__ == "__main__":
+    transcript_summary = sample_summary()
+
+    # Serialize and print JSON
+    print(transcript_summary.model_dump_json(indent=2))
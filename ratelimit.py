@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableConfig, RunnableLambda
+
+
+logger = logging.getLogger("extraction")
+
+# Status codes that mean "slow down": rate limited, and overloaded.
+THROTTLE_STATUS = (429, 503)
+_THROTTLE_ERRORS = ("ResourceExhausted", "RateLimitError", "TooManyRequests", "ServiceUnavailable")
+
+
+def estimate_tokens(messages: Any) -> int:
+    """A rough prompt size in tokens (4 characters each), for rate limiting before a call."""
+    if isinstance(messages, BaseMessage):
+        messages = [messages]
+    if not isinstance(messages, Sequence) or isinstance(messages, str):
+        return len(str(messages)) // 4 + 1
+    chars = 0
+    for m in messages:
+        if isinstance(m, BaseMessage):
+            chars += len(m.content) if isinstance(m.content, str) else len(json.dumps(m.content))
+            for tc in getattr(m, "tool_calls", None) or []:
+                chars += len(json.dumps(tc["args"], default=str))
+        else:
+            chars += len(str(m))
+    return chars // 4 + 1
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for obj in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            value = getattr(obj, attr, None)
+            value = value() if callable(value) else value
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_throttled(error: BaseException) -> bool:
+    """Whether ``error`` is the provider asking us to slow down (429/503 or equivalent)."""
+    return _status_code(error) in THROTTLE_STATUS or type(error).__name__ in _THROTTLE_ERRORS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """The delay in seconds a throttling error asks for, if it carries one."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or getattr(
+            error, "headers", None
+        )
+        value = headers.get("retry-after") if headers is not None else None
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(parsedate_to_datetime(str(value)).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def bound_tool_tokens(runnable: Runnable) -> int:
+    """Estimated tokens of the tool schemas bound to ``runnable``, which every request sends."""
+    tools = runnable.kwargs.get("tools") if isinstance(runnable, RunnableBinding) else None
+    return len(json.dumps(tools, default=str)) // 4 if tools else 0
+
+
+class TokenBucket:
+    """A thread-safe token bucket that hands out reservations instead of blocking.
+
+    ``reserve(n)`` takes ``n`` tokens at once, letting the balance go negative, and returns
+    how long the caller has to wait before the tokens are really there. Callers therefore
+    queue in reservation order whether they then sleep in a thread or on an event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float, rate: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def reserve(self, n: float, *, scale: float = 1.0) -> float:
+        """Take ``n`` tokens (at most ``capacity``); returns the seconds to wait for them."""
+        rate = self.rate * scale
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now, rate)
+            self._tokens -= min(n, self.capacity)
+            return max(-self._tokens / rate, 0.0)
+
+    def adjust(self, n: float) -> None:
+        """Take ``n`` more tokens (or give ``-n`` back), e.g. once the real usage is known."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens - n)
+
+
+class RateLimiter:
+    """Client-side request and token rate limits with adaptive backoff, shared by all callers.
+
+    Every call reserves one request and its estimated prompt tokens (plus
+    ``expected_output_tokens``) from per-minute token buckets before it is made; once the
+    response's ``usage_metadata`` is known, the token bucket is corrected to the real count.
+
+    When the provider throttles anyway (429/503), all callers pause until its Retry-After
+    (or an exponential backoff with jitter when it gives none) has passed, instead of each
+    retrying on its own, and the limiter's rates are halved; they recover additively with
+    every successful call. A call is retried up to ``max_retries`` times. The client
+    itself should not retry throttled calls (e.g. ``max_retries=1`` on
+    ``ChatGoogleGenerativeAI``), or the errors never reach the limiter;
+    `registry.ExtractorRegistry` builds its rate-limited clients that way.
+
+    Args:
+        rpm (float): Requests per minute, or None for no request limit.
+        tpm (float): Tokens per minute, or None for no token limit.
+        burst_seconds (float): How many seconds' worth of the limits may be spent at once.
+        max_retries (int): Throttled attempts to retry before the error is raised.
+        base_delay / max_delay (float): Bounds of the exponential backoff, in seconds.
+        expected_output_tokens (int): Added to each call's estimate up front.
+    """
+
+    def __init__(
+        self,
+        *,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        expected_output_tokens: int = 0,
+        estimate: Callable[[Any], int] = estimate_tokens,
+    ):
+        self.requests = TokenBucket(rpm / 60, max(rpm * burst_seconds / 60, 1)) if rpm else None
+        self.tokens = TokenBucket(tpm / 60, max(tpm * burst_seconds / 60, 1)) if tpm else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.expected_output_tokens = expected_output_tokens
+        self.estimate = estimate
+        self.scale = 1.0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+        self._paused_until = 0.0
+        self._consecutive = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, n: int) -> float:
+        with self._lock:
+            scale = self.scale
+            wait = max(self._paused_until - time.monotonic(), 0.0)
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1, scale=scale))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(n, scale=scale))
+        with self._lock:
+            self.waited_seconds += wait
+        return wait
+
+    def _succeeded(self, estimated: int, result: Any) -> None:
+        usage = getattr(result, "usage_metadata", None) or {}
+        if self.tokens is not None and usage.get("total_tokens"):
+            self.tokens.adjust(usage["total_tokens"] - estimated)
+        with self._lock:
+            self._consecutive = 0
+            self.scale = min(self.scale + 0.05, 1.0)
+
+    def _throttled(self, error: BaseException) -> float:
+        """Pause every caller after a throttling error; returns this caller's delay."""
+        delay = retry_after(error)
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            # Calls in flight when the limit was hit all come back throttled; count them as
+            # one episode, so that a burst does not halve the rates over and over.
+            if now >= self._paused_until:
+                self._consecutive += 1
+                self.scale = max(self.scale / 2, 0.05)
+            if delay is None:
+                backoff = min(self.base_delay * 2 ** (self._consecutive - 1), self.max_delay)
+                delay = random.uniform(backoff / 2, backoff)
+            self._paused_until = max(self._paused_until, now + delay)
+            delay = self._paused_until - now
+        logger.debug(f"Throttled ({error!r}); pausing all calls for {delay:.2f}s")
+        return delay
+
+    def _should_retry(self, error: BaseException, attempt: int) -> bool:
+        return is_throttled(error) and attempt < self.max_retries
+
+    def call(self, func: Callable[[Any], Any], input: Any, tokens: int = 0) -> Any:
+        """Call ``func(input)`` within the limits, retrying it when throttled."""
+        estimated = self.estimate(input) + tokens + self.expected_output_tokens
+        attempt = 0
+        while True:
+            time.sleep(self._reserve(estimated))
+            try:
+                result = func(input)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self._throttled(e))
+                attempt += 1
+                continue
+            self._succeeded(estimated, result)
+            return result
+
+    async def acall(self, func: Callable[[Any], Any], input: Any, tokens: int = 0) -> Any:
+        """Async counterpart of `call`; ``func`` returns an awaitable."""
+        estimated = self.estimate(input) + tokens + self.expected_output_tokens
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve(estimated))
+            try:
+                result = await func(input)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self._throttled(e))
+                attempt += 1
+                continue
+            self._succeeded(estimated, result)
+            return result
+
+    def wrap(self, runnable: Runnable, tool_tokens: Optional[int] = None) -> Runnable:
+        """``runnable`` (a chat model, possibly with bound tools) with every call rate limited.
+
+        ``tool_tokens`` defaults to `bound_tool_tokens` of ``runnable``; pass it when the
+        model with the bound tools is wrapped in another runnable.
+        """
+        if tool_tokens is None:
+            tool_tokens = bound_tool_tokens(runnable)
+
+        def limited(input: Any, config: RunnableConfig) -> AIMessage:
+            return self.call(lambda x: runnable.invoke(x, config), input, tool_tokens)
+
+        async def alimited(input: Any, config: RunnableConfig) -> AIMessage:
+            return await self.acall(lambda x: runnable.ainvoke(x, config), input, tool_tokens)
+
+        return RunnableLambda(limited, afunc=alimited, name="RateLimited")
@@ -0,0 +1,128 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Literal, Optional, Sequence, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+
+Strategy = Literal["default", "jsonpatch"]
+
+
+def _gemini(model: str, max_retries: int = 6) -> BaseChatModel:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    from config import get_env
+
+    return ChatGoogleGenerativeAI(
+        model=model, api_key=get_env("GOOGLE_API_KEY"), max_retries=max_retries
+    )
+
+
+def bind_extractor(
+    llm: BaseChatModel,
+    tools: Sequence[Any],
+    *,
+    tool_choice: Optional[str] = None,
+    strategy: Strategy = "default",
+    **options: Any,
+) -> Runnable:
+    """Bind ``llm`` with the validation graph of the given retry ``strategy``, uncached."""
+    if strategy == "jsonpatch":
+        from jsonPatch import bind_validator_with_jsonpatch_retries as bind
+    elif strategy == "default":
+        from graph import bind_validator_with_retries as bind
+    else:
+        raise ValueError(f"Unknown retry strategy: {strategy!r}")
+    return bind(llm, tools=list(tools), tool_choice=tool_choice, **options)
+
+
+class ExtractorRegistry:
+    """Compiles each extractor once and hands out the same runnable afterwards.
+
+    Extractors are keyed on the model name, the tools, ``tool_choice``, the retry strategy
+    and any further binding options (``max_attempts``, ``history``, ``metrics``, ...). Chat
+    model clients are shared per model name, and so are their rate limiters (see
+    `set_rate_limiter`), so every extractor on a model draws from the same quota.
+    Rate-limited extractors get a client built with ``max_retries=1`` (a single attempt),
+    so throttling errors reach the limiter instead of being retried by each caller on its
+    own schedule; ``model_factory`` must accept that keyword to be used with a limiter.
+    Compiled validation graphs keep no per-call state, so the returned runnables can be
+    used from many threads at once.
+    """
+
+    def __init__(self, model_factory: Callable[[str], BaseChatModel] = _gemini):
+        self._model_factory = model_factory
+        self._models: Dict[str, BaseChatModel] = {}
+        self._rate_limiters: Dict[str, Any] = {}
+        self._extractors: Dict[Tuple[Hashable, ...], Runnable] = {}
+        self._lock = threading.RLock()
+
+    def model(self, name: str, *, retries: bool = True) -> BaseChatModel:
+        """The shared chat model client for ``name``; without its own ``retries`` if False."""
+        key = name if retries else f"{name} (no retries)"
+        with self._lock:
+            if key not in self._models:
+                if retries:
+                    self._models[key] = self._model_factory(name)
+                else:
+                    self._models[key] = self._model_factory(name, max_retries=1)
+            return self._models[key]
+
+    def set_rate_limiter(self, name: str, limiter: Any) -> None:
+        """Rate limit every extractor built for model ``name`` from now on with ``limiter``.
+
+        Extractors already built keep the limiter (or none) they were built with.
+        """
+        with self._lock:
+            self._rate_limiters[name] = limiter
+
+    def get(
+        self,
+        tools: Sequence[Any],
+        *,
+        model: str = "gemini-1.5-pro",
+        tool_choice: Optional[str] = None,
+        strategy: Strategy = "default",
+        **options: Any,
+    ) -> Runnable:
+        """Return the compiled extractor for this configuration, building it on first use."""
+        if "rate_limiter" not in options and model in self._rate_limiters:
+            options["rate_limiter"] = self._rate_limiters[model]
+        key = (model, tuple(tools), tool_choice, strategy, tuple(sorted(options.items())))
+        extractor = self._extractors.get(key)
+        if extractor is not None:
+            return extractor
+        with self._lock:
+            extractor = self._extractors.get(key)
+            if extractor is None:
+                llm = self.model(model, retries=options.get("rate_limiter") is None)
+                extractor = self._build(llm, tools, tool_choice, strategy, options)
+                self._extractors[key] = extractor
+            return extractor
+
+    @staticmethod
+    def _build(
+        llm: BaseChatModel,
+        tools: Sequence[Any],
+        tool_choice: Optional[str],
+        strategy: Strategy,
+        options: Dict[str, Any],
+    ) -> Runnable:
+        return bind_extractor(llm, tools, tool_choice=tool_choice, strategy=strategy, **options)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._extractors.clear()
+            self._models.clear()
+            self._rate_limiters.clear()
+
+    def __len__(self) -> int:
+        return len(self._extractors)
+
+
+default_registry = ExtractorRegistry()
+
+
+def get_extractor(tools: Sequence[Any], **kwargs: Any) -> Runnable:
+    """`ExtractorRegistry.get` on the process-wide default registry."""
+    return default_registry.get(tools, **kwargs)
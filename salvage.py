@@ -0,0 +1,124 @@
+import copy
+import logging
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple, Type, Union
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel, ValidationError
+
+from schemas import SchemaIndex, json_pointer, schema_index
+
+
+logger = logging.getLogger("extraction")
+
+Path = Tuple[Union[str, int], ...]
+
+
+class SalvageResult(NamedTuple):
+    """A value recovered from invalid arguments and the JSON Pointers of what was dropped."""
+
+    value: BaseModel
+    dropped: List[str]
+
+
+def _data_path(data: Any, loc: Sequence[Union[str, int]]) -> Path:
+    """The part of a pydantic error location that exists in ``data``.
+
+    Union tags and constraint names pydantic adds to locations are skipped, and the walk
+    stops at the first key that is missing (the "missing" field itself).
+    """
+    path: List[Union[str, int]] = []
+    node = data
+    for part in loc:
+        if isinstance(node, dict) and part in node:
+            node = node[part]
+        elif isinstance(node, list) and isinstance(part, int) and 0 <= part < len(node):
+            node = node[part]
+        elif isinstance(node, list) and isinstance(part, str):
+            continue
+        else:
+            break
+        path.append(part)
+    return tuple(path)
+
+
+def _removal_target(index: SchemaIndex, data: Any, loc: Sequence[Union[str, int]]) -> Optional[Path]:
+    """The smallest piece of ``data`` whose removal gets rid of the error at ``loc``.
+
+    That is the deepest enclosing list element, or the deepest enclosing field that is not
+    required (so that its default applies), whichever is closer to the error.
+    """
+    path = _data_path(data, loc)
+    for end in range(len(path), 0, -1):
+        last = path[end - 1]
+        if isinstance(last, int) or last not in index.required(path[: end - 1]):
+            return path[:end]
+    return None
+
+
+def _remove(data: Any, path: Path) -> None:
+    parent = data
+    for part in path[:-1]:
+        parent = parent[part]
+    del parent[path[-1]]
+
+
+def salvage(model: Type[BaseModel], args: Mapping[str, Any], *, max_rounds: int = 20) -> SalvageResult:
+    """Recover the largest valid ``model`` that ``args`` contains.
+
+    Each round validates the arguments and, for every error, removes the innermost list
+    element or optional field that encloses it; removed fields fall back to their defaults.
+    The dropped locations are JSON Pointers into the arguments as they stood in the round
+    they were removed in (so list indices in later rounds account for earlier removals).
+
+    Raises:
+        ValueError: If an error is not enclosed by any list element or optional field
+            (e.g. a required top-level field), or ``max_rounds`` is exceeded.
+    """
+    index = schema_index(model)
+    data = copy.deepcopy(dict(args))
+    dropped: List[str] = []
+    for _ in range(max_rounds):
+        try:
+            return SalvageResult(model.model_validate(data), dropped)
+        except ValidationError as e:
+            errors = e.errors()
+        targets: Set[Path] = set()
+        for detail in errors:
+            target = _removal_target(index, data, detail.get("loc", ()))
+            if target is None:
+                raise ValueError(
+                    f"Cannot salvage {model.__name__}: the error at "
+                    f"{json_pointer(detail.get('loc', ()))} is in a required field."
+                )
+            targets.add(target)
+        # Remove outer targets only, and later list elements first so that
+        # earlier indices stay valid.
+        outermost = [t for t in targets if not any(t[:i] in targets for i in range(1, len(t)))]
+        for target in sorted(outermost, key=lambda t: [(isinstance(p, int), p) for p in t], reverse=True):
+            _remove(data, target)
+            dropped.append(json_pointer(target))
+    raise ValueError(f"Cannot salvage {model.__name__} in {max_rounds} rounds.")
+
+
+def salvage_message(message: AIMessage, schemas: Mapping[str, Type[Any]]) -> AIMessage:
+    """Salvage every tool call in ``message`` against its schema in ``schemas``.
+
+    The dropped paths are reported per tool call ID under
+    ``additional_kwargs["salvaged"]``; calls that needed no changes are left out.
+    """
+    tool_calls = []
+    salvaged: Dict[str, List[str]] = {}
+    for tc in message.tool_calls:
+        schema = schemas.get(tc["name"])
+        if not (isinstance(schema, type) and issubclass(schema, BaseModel)):
+            raise ValueError(f"Cannot salvage tool call {tc['name']}: no pydantic schema.")
+        result = salvage(schema, tc["args"])
+        if result.dropped:
+            logger.debug(f"Salvaged {tc['name']} ({tc['id']}) by dropping {result.dropped}")
+            salvaged[tc["id"]] = result.dropped
+        tool_calls.append({**tc, "args": result.value.model_dump(mode="json")})
+    return AIMessage(
+        content=message.content,
+        tool_calls=tool_calls,
+        additional_kwargs={**message.additional_kwargs, "salvaged": salvaged},
+    )
@@ -0,0 +1,118 @@
+import functools
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from pydantic import BaseModel, ValidationError
+
+
+Loc = Tuple[Union[str, int], ...]
+
+
+def json_pointer(loc: Sequence[Union[str, int]]) -> str:
+    """Render a pydantic error location as a JSON Pointer (RFC 6901)."""
+    return "".join(
+        "/" + str(part).replace("~", "~0").replace("/", "~1") for part in loc
+    )
+
+
+class SchemaIndex:
+    """The JSON schema of one tool, serialized once, with sub-schemas looked up by location.
+
+    ``subschema(loc)`` walks ``properties`` / ``items`` (following ``$ref`` and nullable
+    ``anyOf`` wrappers) down to the field a pydantic error points at, and returns just that
+    piece plus the ``$defs`` it references. Results are memoized per location shape, so
+    ``key_moments[2]`` and ``key_moments[5]`` share one entry.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.name = model.__name__
+        self.schema: Dict[str, Any] = model.model_json_schema()
+        self.defs: Dict[str, Any] = self.schema.get("$defs", {})
+        self.full_json = json.dumps(self.schema)
+        self._subschemas: Dict[Loc, Dict[str, Any]] = {}
+
+    def _deref(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        while True:
+            if "$ref" in node:
+                node = self.defs[node["$ref"].rsplit("/", 1)[-1]]
+            elif "anyOf" in node:
+                branches = [b for b in node["anyOf"] if b.get("type") != "null"]
+                if len(branches) != 1:
+                    return node
+                node = branches[0]
+            else:
+                return node
+
+    def _with_defs(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach the transitive closure of ``$defs`` that ``node`` refers to."""
+        needed: Dict[str, Any] = {}
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, dict):
+                ref = current.get("$ref")
+                if isinstance(ref, str):
+                    name = ref.rsplit("/", 1)[-1]
+                    if name not in needed:
+                        needed[name] = self.defs[name]
+                        stack.append(self.defs[name])
+                stack.extend(v for k, v in current.items() if k != "$ref")
+            elif isinstance(current, list):
+                stack.extend(current)
+        node = {k: v for k, v in node.items() if k != "$defs"}
+        if needed:
+            node["$defs"] = dict(sorted(needed.items()))
+        return node
+
+    def subschema(self, loc: Sequence[Union[str, int]]) -> Dict[str, Any]:
+        """Return the schema of the field at ``loc`` (falling back to the deepest known parent)."""
+        shape: Loc = tuple(-1 if isinstance(part, int) else part for part in loc)
+        cached = self._subschemas.get(shape)
+        if cached is not None:
+            return cached
+        node = self.schema
+        for part in shape:
+            resolved = self._deref(node)
+            if part == -1:
+                if "items" not in resolved:
+                    break
+                node = resolved["items"]
+            elif part in resolved.get("properties", {}):
+                node = resolved["properties"][part]
+            # Otherwise the part is a union tag or a constraint name pydantic adds to
+            # the location; it does not correspond to a schema level, so skip it.
+        result = self._with_defs(node) if node is not self.schema else self.schema
+        self._subschemas[shape] = result
+        return result
+
+    def required(self, loc: Sequence[Union[str, int]]) -> List[str]:
+        """The required property names of the object at ``loc``."""
+        return self._deref(self.subschema(loc)).get("required", [])
+
+    def for_error(self, error: BaseException) -> str:
+        """Serialize only the sub-schemas relevant to ``error``.
+
+        For a pydantic ValidationError this maps the JSON Pointer of each failing location
+        to the schema expected there; for anything else it returns the full schema.
+        """
+        if not isinstance(error, ValidationError):
+            return self.full_json
+        locations: Dict[str, Dict[str, Any]] = {}
+        for detail in error.errors():
+            loc = detail.get("loc", ())
+            if not loc:
+                return self.full_json
+            locations.setdefault(json_pointer(loc), self.subschema(loc))
+        return json.dumps(locations)
+
+
+@functools.lru_cache(maxsize=None)
+def schema_index(model: Type[BaseModel]) -> SchemaIndex:
+    """The shared `SchemaIndex` for ``model``; built once per process."""
+    return SchemaIndex(model)
+
+
+def schema_index_or_none(model: Any) -> Optional[SchemaIndex]:
+    if isinstance(model, type) and issubclass(model, BaseModel):
+        return schema_index(model)
+    return None
@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, PrivateAttr
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def tool_call_message(name: str, args: Dict[str, Any], *, call_id: Optional[str] = None) -> AIMessage:
+    """An AI message carrying a single tool call."""
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": call_id or f"call_{uuid.uuid4().hex[:12]}"}],
+    )
+
+
+def patch_message(
+    patches: List[Dict[str, Any]],
+    *,
+    target_id: Optional[str] = None,
+    reasoning: str = "Fixing the reported validation errors.",
+) -> AIMessage:
+    """An AI message carrying a ``PatchFunctionParameters`` call.
+
+    If ``target_id`` is None the model fills in the ID of the most recent non-patch tool
+    call it was shown, the way a well-behaved LLM would.
+    """
+    return tool_call_message(
+        "PatchFunctionParameters",
+        {"tool_call_id": target_id, "reasoning": reasoning, "patches": patches},
+    )
+
+
+class ScriptedChatModel(BaseChatModel):
+    """A local stand-in chat model that replays scripted responses.
+
+    ``script`` is an iterable of AIMessages (or callables taking the prompt messages and
+    returning one), replayed in order and cycled when ``cycle=True``. Responses are deep
+    copied with fresh tool call IDs, and usage metadata is estimated from the prompt and
+    output sizes. ``latency`` seconds of simulated network time are added to every call
+    (``time.sleep`` / ``asyncio.sleep``), so graph overhead can be measured with it at 0.
+    When streamed, tool call arguments arrive in fragments of ``chunk_chars`` characters.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # AIMessages or callables; a Union annotation makes pydantic try to coerce
+    # functions into AIMessages, which fails inside the message's own validators.
+    script: Sequence[Any]
+    cycle: bool = True
+    latency: float = 0.0
+    chunk_chars: int = 16
+    model: str = "scripted"
+
+    _responses: Iterator = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Restart the script from its first response."""
+        self._responses = itertools.cycle(self.script) if self.cycle else iter(self.script)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        tool_choice: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Runnable:
+        # Convert the schemas like a real provider integration would, so that
+        # binding cost shows up in compile-time measurements.
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        with self._lock:
+            try:
+                response = next(self._responses)
+            except StopIteration:
+                raise ValueError("ScriptedChatModel ran out of scripted responses.")
+        if callable(response):
+            response = response(messages)
+        message = response.model_copy(deep=True)
+        if message.tool_calls:
+            last_call_id = _last_tool_call_id(messages)
+            calls = []
+            for tc in message.tool_calls:
+                tc = {**tc, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                if tc["name"] == "PatchFunctionParameters" and tc["args"].get("tool_call_id") is None:
+                    tc["args"] = {**tc["args"], "tool_call_id": last_call_id}
+                calls.append(tc)
+            message.tool_calls = calls
+        prompt_text = "".join(str(m.content) for m in messages) + "".join(
+            json.dumps(tc["args"]) for m in messages for tc in getattr(m, "tool_calls", [])
+        )
+        output_text = str(message.content) + "".join(json.dumps(tc["args"]) for tc in message.tool_calls)
+        input_tokens, output_tokens = _estimate_tokens(prompt_text), _estimate_tokens(output_text)
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    def _chunks(self, messages: List[BaseMessage]) -> Iterator[ChatGenerationChunk]:
+        message = self._next_message(messages)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=message.content, id=message.id))
+        for index, tc in enumerate(message.tool_calls):
+            args = json.dumps(tc["args"])
+            for start in range(0, max(len(args), 1), self.chunk_chars):
+                first = start == 0
+                tool_call_chunk = {
+                    "index": index,
+                    "id": tc["id"] if first else None,
+                    "name": tc["name"] if first else None,
+                    "args": args[start : start + self.chunk_chars],
+                }
+                chunk = AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk])
+                yield ChatGenerationChunk(message=chunk)
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=message.usage_metadata)
+        )
+
+    def _stream(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        yield from self._chunks(messages)
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(messages):
+            yield chunk
+
+
+def _last_tool_call_id(messages: Iterable[BaseMessage]) -> Optional[str]:
+    """ID of the tool call the latest ToolMessage answered, i.e. the call being corrected."""
+    for m in reversed(list(messages)):
+        if m.type == "tool":
+            return m.tool_call_id
+    return None
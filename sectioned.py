@@ -0,0 +1,214 @@
+import logging
+import uuid
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Type, Union
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda, RunnableParallel
+from pydantic import BaseModel, Field
+
+from nested import InsightfulQuote, KeyMoments, Member, OutputFormat, TranscriptMetadata, TranscriptSummary
+
+
+logger = logging.getLogger("extraction")
+
+
+# Each section is a tool of its own whose fields are a subset of TranscriptSummary's, so
+# the validated sections can be merged back into one summary field by field.
+class MetadataSection(BaseModel):
+    """Respond with the metadata (title, location, duration) of the interview."""
+
+    # Optional, as on TranscriptSummary, so that salvage can drop invalid metadata.
+    metadata: Optional[TranscriptMetadata] = None
+
+
+class ParticipantsSection(BaseModel):
+    """Respond with every participant of the interview."""
+
+    participants: List[Member] = Field(
+        ..., description="A list of participants in the interview."
+    )
+
+
+class KeyMomentsSection(BaseModel):
+    """Respond with the key moments of the interview, grouped by topic."""
+
+    key_moments: List[KeyMoments] = Field(
+        ..., description="A list of key moments from the interview."
+    )
+
+
+class InsightfulQuotesSection(BaseModel):
+    """Respond with the most insightful quotes from the interview."""
+
+    insightful_quotes: List[InsightfulQuote] = Field(
+        ..., description="A list of insightful quotes from the interview."
+    )
+
+
+class OverviewSection(BaseModel):
+    """Respond with an overall summary of the interview, its next steps and any other relevant data."""
+
+    overall_summary: str = Field(..., description="An overall summary of the interview.")
+    next_steps: List[str] = Field(
+        default_factory=list, description="Next steps or action items."
+    )
+    other_stuff: List[OutputFormat] = Field(
+        default_factory=list, description="Other relevant data."
+    )
+
+
+SECTIONS: Sequence[Type[BaseModel]] = (
+    MetadataSection,
+    ParticipantsSection,
+    KeyMomentsSection,
+    InsightfulQuotesSection,
+    OverviewSection,
+)
+
+
+def section_prompt(section: Type[BaseModel]) -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                f"Respond directly using the {section.__name__} function. The other parts"
+                " of the summary are extracted separately; only fill in this function's fields.",
+            ),
+            ("placeholder", "{messages}"),
+        ]
+    )
+
+
+def assemble_summary(sections: Mapping[str, AIMessage]) -> AIMessage:
+    """Merge the validated section messages into one TranscriptSummary tool call.
+
+    The result has the same shape as the single-call extractor's output, so callers that
+    read the ``TranscriptSummary`` tool call (batch, chunking, caching) work unchanged.
+    """
+    args: Dict[str, Any] = {}
+    dropped: List[str] = []
+    for name, message in sections.items():
+        # Section fields are summary fields, so salvaged paths carry over as they are.
+        for paths in message.additional_kwargs.get("salvaged", {}).values():
+            dropped.extend(paths)
+        calls = [tc for tc in message.tool_calls if tc["name"] == name]
+        if not calls:
+            logger.debug(f"Section {name} returned no tool call; using the summary defaults.")
+            continue
+        args.update(calls[-1]["args"])
+    summary = TranscriptSummary.model_validate(args)
+    call_id = f"call_{uuid.uuid4().hex[:12]}"
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {
+                "name": TranscriptSummary.__name__,
+                "args": summary.model_dump(mode="json"),
+                "id": call_id,
+            }
+        ],
+        additional_kwargs={"salvaged": {call_id: dropped}} if dropped else {},
+    )
+
+
+def _section_defaults(section: Type[BaseModel]) -> Runnable:
+    """Stand in for a section whose extraction failed outright, when salvaging.
+
+    Returns no tool call, so `assemble_summary` uses the summary defaults for the section's
+    fields, and reports those fields as dropped.
+    """
+    name = section.__name__
+
+    def defaults(x: dict) -> AIMessage:
+        logger.warning(f"Section {name} failed; using the summary defaults: {x['error']!r}")
+        dropped = [f"/{field}" for field in section.model_fields]
+        return AIMessage(content="", additional_kwargs={"salvaged": {name: dropped}})
+
+    return RunnableLambda(defaults, name=f"{name}Defaults")
+
+
+def build_sectioned_chain(
+    llm: Optional[BaseChatModel] = None,
+    *,
+    sections: Sequence[Type[BaseModel]] = SECTIONS,
+    max_attempts: Union[int, Mapping[str, int]] = 3,
+    strategy: str = "default",
+    cache=None,
+    metrics=None,
+    flights=None,
+    model: str = "gemini-1.5-pro",
+    **options: Any,
+) -> Runnable:
+    """Build an extraction chain that fills TranscriptSummary one section at a time, in parallel.
+
+    Each section (metadata, participants, key moments, quotes and the overview) is its own
+    forced tool call with its own validation graph and retry budget, so a bad nested field
+    only retries the section it belongs to, and the wall-clock time is that of the slowest
+    section. The chain takes the same ``{"messages": [...]}`` input as
+    `invoke2.build_extraction_chain` and returns an AIMessage with one ``TranscriptSummary``
+    tool call.
+
+    Args:
+        llm (BaseChatModel): The chat model. Defaults to the registry's shared ``model``.
+        sections (list): The section models; their fields must be TranscriptSummary fields.
+        max_attempts (int | dict): The retry budget, for all sections or per section name.
+        strategy (str): "default" or "jsonpatch" retries.
+        cache (ExtractionCache): If provided, each section's result is cached separately,
+            so rerunning an item only redoes the sections that failed.
+        metrics (ExtractionMetrics): Attached to every section's validation graph.
+        flights (SingleFlight): If provided, identical section requests in progress at the
+            same time share one run.
+        **options: Further options for the binder (``history``, ``validator_mode``, ...).
+            With ``salvage=True``, a section that cannot be salvaged either (e.g. one with
+            an invalid required field) falls back to the summary defaults for its fields,
+            reported as dropped, instead of failing the whole summary.
+
+    Returns:
+        Runnable: A runnable that returns a single AI message with the assembled summary.
+    """
+    from cache import model_name_of, with_cache
+    from graph import _inline
+    from registry import bind_extractor, get_extractor
+
+    if llm is not None:
+        model = model_name_of(llm)
+    chains: Dict[str, Runnable] = {}
+    for section in sections:
+        name = section.__name__
+        attempts = max_attempts if isinstance(max_attempts, int) else max_attempts.get(name, 3)
+        kwargs = dict(
+            tool_choice=name, strategy=strategy, max_attempts=attempts, metrics=metrics, **options
+        )
+        if llm is None:
+            extractor = get_extractor([section], model=model, **kwargs)
+        else:
+            extractor = bind_extractor(llm, [section], **kwargs)
+        if cache is not None:
+            extractor = with_cache(
+                extractor,
+                cache,
+                tools=[section],
+                model_name=model,
+                max_attempts=attempts,
+                options=kwargs,
+            )
+        if flights is not None:
+            from singleflight import with_single_flight
+
+            extractor = with_single_flight(
+                extractor,
+                flights,
+                tools=[section],
+                model_name=model,
+                max_attempts=attempts,
+                options=kwargs,
+            )
+        chain = section_prompt(section) | extractor
+        if options.get("salvage"):
+            chain = chain.with_fallbacks([_section_defaults(section)], exception_key="error")
+        chains[name] = chain
+    return (RunnableParallel(chains) | _inline(assemble_summary)).with_config(
+        run_name="SectionedExtraction"
+    )
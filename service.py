@@ -0,0 +1,367 @@
+import argparse
+import json
+import logging
+import math
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable
+
+from batch import _extract_one
+from ingest import read_turns
+
+
+logger = logging.getLogger("extraction")
+
+Turn = Tuple[str, str]
+
+
+class QueueFull(Exception):
+    """The work queue cannot take a request; ``retry_after`` estimates when it can."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"The work queue is full; retry in {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    """One queued transcript and where its result record goes."""
+
+    transcript_id: str
+    turns: List[Turn]
+    results: "queue.Queue[Dict[str, Any]]"
+    cancelled: bool = False
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class ExtractionService:
+    """Runs extractions from a bounded work queue on a fixed pool of worker threads.
+
+    `submit` takes all of a request's transcripts or none of them: when they do not fit in
+    the queue it raises `QueueFull`, which the HTTP layer turns into a 429. Each result is
+    put on the request's own results queue as soon as it finishes, in the record format of
+    `batch.run_batch`. Jobs of a request whose client went away are skipped.
+    """
+
+    def __init__(
+        self,
+        chain: Runnable,
+        *,
+        workers: int = 4,
+        queue_size: int = 64,
+        compact: bool = False,
+        drop_filler: bool = False,
+        metrics: Optional[Any] = None,
+    ):
+        self.chain = chain
+        self.compact = compact
+        self.drop_filler = drop_filler
+        self.metrics = metrics
+        self.queue_size = queue_size
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.in_progress = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # An exponentially weighted average of job seconds, for Retry-After estimates.
+        self.average_seconds: Optional[float] = None
+        self._workers = [
+            threading.Thread(target=self._work, name=f"extraction-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def healthy(self) -> bool:
+        return all(worker.is_alive() for worker in self._workers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "capacity": self.queue_size,
+                "in_progress": self.in_progress,
+                "workers": len(self._workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "average_seconds": self.average_seconds,
+            }
+
+    def submit(self, transcripts: List[Tuple[str, List[Turn]]]) -> "queue.Queue[Dict[str, Any]]":
+        """Queue ``(transcript_id, turns)`` pairs; returns the queue their results arrive on.
+
+        Raises:
+            QueueFull: If the queue has no room for all of them right now.
+            ValueError: If there are more of them than the queue can ever hold.
+        """
+        if len(transcripts) > self.queue_size:
+            raise ValueError(
+                f"{len(transcripts)} transcripts do not fit in a queue of {self.queue_size};"
+                " split the request."
+            )
+        results: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        with self._lock:
+            # Only submit adds to the queue, so the room checked here is still there below.
+            if self.depth + len(transcripts) > self.queue_size:
+                self.rejected += 1
+                backlog = self.depth + self.in_progress + len(transcripts)
+                seconds = self.average_seconds if self.average_seconds is not None else 30.0
+                raise QueueFull(backlog * seconds / len(self._workers))
+            jobs = [Job(transcript_id, turns, results) for transcript_id, turns in transcripts]
+            for job in jobs:
+                self._queue.put_nowait(job)
+        return results
+
+    def cancel(self, jobs: "queue.Queue[Dict[str, Any]]") -> None:
+        """Skip the queued jobs that report to ``jobs`` (their client is gone)."""
+        with self._queue.mutex:
+            for job in self._queue.queue:
+                if job is not None and job.results is jobs:
+                    job.cancelled = True
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if job.cancelled:
+                continue
+            with self._lock:
+                self.in_progress += 1
+            start = time.perf_counter()
+            try:
+                record = _extract_one(
+                    self.chain, (job.transcript_id, job.turns), self.compact, self.drop_filler
+                )
+            finally:
+                seconds = time.perf_counter() - start
+                with self._lock:
+                    self.in_progress -= 1
+                    if self.average_seconds is None:
+                        self.average_seconds = seconds
+                    else:
+                        self.average_seconds = 0.9 * self.average_seconds + 0.1 * seconds
+            with self._lock:
+                if record["ok"]:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            record["queued_seconds"] = start - job.queued_at
+            job.results.put(record)
+
+    def close(self) -> None:
+        """Stop the workers once the jobs already queued are done."""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def to_prometheus(self, prefix: str = "extraction") -> str:
+        """The queue gauges (and graph metrics, if any) in the Prometheus text format."""
+        stats = self.stats()
+        lines = [
+            f"# TYPE {prefix}_queue_depth gauge",
+            f"{prefix}_queue_depth {stats['depth']}",
+            f"# TYPE {prefix}_queue_capacity gauge",
+            f"{prefix}_queue_capacity {stats['capacity']}",
+            f"# TYPE {prefix}_in_progress gauge",
+            f"{prefix}_in_progress {stats['in_progress']}",
+            f"# TYPE {prefix}_jobs_total counter",
+            f'{prefix}_jobs_total{{outcome="ok"}} {stats["completed"]}',
+            f'{prefix}_jobs_total{{outcome="failed"}} {stats["failed"]}',
+            f"# TYPE {prefix}_rejected_requests_total counter",
+            f"{prefix}_rejected_requests_total {stats['rejected']}",
+        ]
+        text = "\n".join(lines) + "\n"
+        if self.metrics is not None:
+            text += self.metrics.to_prometheus(prefix)
+        return text
+
+
+def parse_transcripts(body: bytes, content_type: str = "") -> List[Tuple[str, List[Turn]]]:
+    """Read the transcripts of a request body.
+
+    The body is one transcript (an object with an optional ``id`` and ``turns`` or
+    ``transcript``), a JSON array of them, or, as ``application/x-ndjson``, one per line.
+    Transcripts without an ID get a random one.
+
+    Raises:
+        ValueError: If the body is not one of these.
+    """
+    text = body.decode("utf-8")
+    if "ndjson" in content_type:
+        payloads = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        payload = json.loads(text)
+        # An array of transcript objects (an empty one has none), or else a single
+        # transcript (possibly a bare list of turns).
+        many = isinstance(payload, list) and (not payload or isinstance(payload[0], dict))
+        payloads = payload if many else [payload]
+    transcripts = []
+    for payload in payloads:
+        transcript_id = payload.get("id") if isinstance(payload, dict) else None
+        transcripts.append((str(transcript_id or uuid.uuid4().hex), read_turns(payload)))
+    if not transcripts:
+        raise ValueError("The request has no transcripts.")
+    return transcripts
+
+
+def make_handler(service: ExtractionService) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            if isinstance(body, str):
+                data, content_type = body.encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                data, content_type = json.dumps(body).encode("utf-8"), "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self) -> None:
+            if self.path == "/healthz":
+                healthy = service.healthy()
+                self._send(200 if healthy else 503, {"status": "ok" if healthy else "unhealthy"})
+            elif self.path == "/queue":
+                self._send(200, service.stats())
+            elif self.path == "/metrics":
+                self._send(200, service.to_prometheus())
+            else:
+                self._send(404, {"error": f"No route {self.path}."})
+
+        def do_POST(self) -> None:
+            if self.path != "/extract":
+                self._send(404, {"error": f"No route {self.path}."})
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                transcripts = parse_transcripts(body, self.headers.get("Content-Type", ""))
+                results = service.submit(transcripts)
+            except QueueFull as e:
+                self._send(
+                    429,
+                    {"error": str(e), **service.stats()},
+                    {"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+                )
+                return
+            except (ValueError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            # Stream each result as one NDJSON line as soon as it is ready.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for _ in transcripts:
+                    record = results.get()
+                    self._chunk((json.dumps(record, default=str) + "\n").encode("utf-8"))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info("Client disconnected; skipping the rest of its transcripts.")
+                service.cancel(results)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def serve(service: ExtractionService, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    """An HTTP server for ``service``; call ``serve_forever()`` on it.
+
+    Routes: ``POST /extract`` streams NDJSON result records (429 with Retry-After when
+    the queue is full), ``GET /healthz``, ``GET /queue`` (depth and counters, for
+    autoscaling on queue length) and ``GET /metrics`` (Prometheus text).
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve transcript extraction over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Extractions run at once.")
+    parser.add_argument("--queue-size", type=int, default=64, help="Transcripts that may wait.")
+    parser.add_argument("--strategy", default="default", choices=["default", "jsonpatch"])
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--cache", help="SQLite file to cache validated results in.")
+    parser.add_argument("--compact", action="store_true", help="Send compacted transcripts.")
+    parser.add_argument(
+        "--drop-filler",
+        action="store_true",
+        help="With --compact, leave out turns that are only hesitation sounds.",
+    )
+    parser.add_argument("--salvage", action="store_true", help="Return partial results.")
+    parser.add_argument("--rpm", type=float, help="Client-side limit on model requests per minute.")
+    parser.add_argument("--tpm", type=float, help="Client-side limit on model tokens per minute.")
+    args = parser.parse_args(argv)
+
+    from invoke2 import build_extraction_chain
+    from metrics import ExtractionMetrics
+    from singleflight import SingleFlight
+
+    cache = None
+    if args.cache:
+        from cache import ExtractionCache
+
+        cache = ExtractionCache(args.cache)
+    rate_limiter = None
+    if args.rpm or args.tpm:
+        from ratelimit import RateLimiter
+
+        rate_limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    metrics = ExtractionMetrics()
+    chain = build_extraction_chain(
+        max_attempts=args.max_attempts,
+        cache=cache,
+        metrics=metrics,
+        salvage=args.salvage,
+        rate_limiter=rate_limiter,
+        flights=SingleFlight(),
+        strategy=args.strategy,
+    )
+    service = ExtractionService(
+        chain,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        compact=args.compact,
+        drop_filler=args.drop_filler,
+        metrics=metrics,
+    )
+    server = serve(service, args.host, args.port)
+    logger.info(f"Serving extractions on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
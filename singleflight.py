@@ -0,0 +1,169 @@
+import asyncio
+import concurrent.futures
+import copy
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from cache import cache_key
+
+
+logger = logging.getLogger("extraction")
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    # A waiter that was cancelled never reads the outcome; mark it read so asyncio
+    # does not log the execution's exception as unhandled.
+    if not future.cancelled():
+        future.exception()
+
+
+def _copy(result: Any) -> Any:
+    if hasattr(result, "model_copy"):
+        return result.model_copy(deep=True)
+    return copy.deepcopy(result)
+
+
+class _Flight:
+    """One in-progress execution and the callers waiting on it."""
+
+    __slots__ = ("future", "waiters", "task")
+
+    def __init__(self) -> None:
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.waiters = 0
+        self.task: Optional[asyncio.Future] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the work; callers that arrive while it is in progress
+    wait for it and get a deep copy of its result, or the same exception. Nothing is kept
+    once the execution finishes, so the next call runs again (put an `ExtractionCache`
+    behind this to reuse results). Sync and async callers can share a flight.
+
+    Cancelling an async caller only stops that caller from waiting. The shared execution
+    runs in its own task and is cancelled only when every caller waiting on it has been;
+    a sync caller cannot be cancelled, so while one waits the execution always finishes.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        """The number of executions in progress."""
+        return len(self._flights)
+
+    def _join(self, key: str) -> Tuple[_Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+                logger.debug(f"Joining the in-flight extraction {key[:12]}")
+            flight.waiters += 1
+            return flight, leader
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        # Callers that arrive from now on start a new execution.
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _leave(self, key: str, flight: _Flight) -> None:
+        """A cancelled async caller stops waiting; the last one cancels the execution."""
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters > 0 or flight.future.done() or flight.task is None:
+                return
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        logger.debug(f"Cancelling the extraction {key[:12]}: no caller is waiting for it")
+        flight.task.cancel()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Return ``func()``, or the result of the call with the same ``key`` in progress."""
+        flight, leader = self._join(key)
+        if not leader:
+            return _copy(flight.future.result())
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key, flight)
+            flight.future.set_exception(e)
+            raise
+        self._finish(key, flight)
+        flight.future.set_result(result)
+        return result
+
+    async def _run(self, key: str, flight: _Flight, func: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._finish(key, flight)
+            flight.future.cancel()
+            raise
+        except BaseException as e:
+            self._finish(key, flight)
+            flight.future.set_exception(e)
+            return
+        self._finish(key, flight)
+        flight.future.set_result(result)
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of `do`; ``func`` returns an awaitable."""
+        flight, leader = self._join(key)
+        if leader:
+            flight.task = asyncio.ensure_future(self._run(key, flight, func))
+        waiter = asyncio.wrap_future(flight.future)
+        waiter.add_done_callback(_retrieve)
+        try:
+            result = await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if not flight.future.cancelled():
+                self._leave(key, flight)
+            raise
+        return result if leader else _copy(result)
+
+
+def with_single_flight(
+    runnable: Runnable[Union[List[AnyMessage], PromptValue], AIMessage],
+    flights: SingleFlight,
+    *,
+    tools: list,
+    model_name: str,
+    max_attempts: int,
+    options: Optional[Dict[str, Any]] = None,
+) -> Runnable[Union[List[AnyMessage], PromptValue], AIMessage]:
+    """Put ``flights`` in front of a runnable returned by `bind_validator_with_retries`.
+
+    Requests are keyed like `cache.with_cache` entries (prompt, tool schemas, model, retry
+    budget and the result-affecting binding ``options``, such as the retry strategy or
+    salvage), so identical extractions submitted while one is running share its
+    validation graph run instead of starting their own. The followers' configs (callbacks,
+    checkpoint thread) are not used; the run happens under the first caller's config.
+    """
+
+    def key_for(x: Union[Sequence[AnyMessage], PromptValue]) -> str:
+        return cache_key(
+            x, tools=tools, model_name=model_name, max_attempts=max_attempts, options=options
+        )
+
+    def coalesced(x: Union[Sequence[AnyMessage], PromptValue], config) -> AIMessage:
+        return flights.do(key_for(x), lambda: runnable.invoke(x, config))
+
+    async def acoalesced(x: Union[Sequence[AnyMessage], PromptValue], config) -> AIMessage:
+        return await flights.ado(key_for(x), lambda: runnable.ainvoke(x, config))
+
+    return RunnableLambda(coalesced, afunc=acoalesced, name="SingleFlightExtraction")
@@ -0,0 +1,491 @@
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import queue
+import threading
+import uuid
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.callbacks.manager import adispatch_custom_event, dispatch_custom_event
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    AnyMessage,
+    BaseMessage,
+    message_chunk_to_message,
+)
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+
+logger = logging.getLogger("extraction")
+
+# Names of the custom callback events `section_streaming` dispatches.
+SECTION_EVENT = "extraction_section"
+RETRY_EVENT = "extraction_retry"
+
+
+class TopLevelMemberScanner:
+    """Incrementally scan a streamed JSON object and report each top-level member once complete.
+
+    Feed it argument fragments as they arrive; ``feed`` returns the ``(key, value)`` pairs
+    whose values were terminated by that fragment (by a ``,`` or the closing ``}``). Only the
+    new text is scanned on each call. A member that is not valid JSON ends the scan: it is
+    recorded in ``error``, the members completed before it are still returned, and later
+    fragments are only appended to ``text``.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start: Optional[int] = None
+        self._colon: Optional[int] = None
+        self.error: Optional[json.JSONDecodeError] = None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, fragment: str) -> List[Tuple[str, Any]]:
+        self._text += fragment
+        completed: List[Tuple[str, Any]] = []
+        if self.error is not None:
+            return completed
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                continue
+            if c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start, self._colon = i + 1, None
+            elif c in "}]" or (c == "," and self._depth == 1):
+                if self._depth == 1 and self._colon is not None:
+                    try:
+                        key = json.loads(text[self._member_start : self._colon])
+                        completed.append((key, json.loads(text[self._colon + 1 : i])))
+                    except json.JSONDecodeError as e:
+                        self.error = e
+                        return completed
+                if c == ",":
+                    self._member_start, self._colon = i + 1, None
+                else:
+                    self._depth -= 1
+            elif c == ":" and self._depth == 1 and self._colon is None:
+                self._colon = i
+        self._pos = len(text)
+        return completed
+
+
+class StreamEvent(NamedTuple):
+    """One event from `stream_sections` / `astream_sections`.
+
+    kind:
+        - "section": ``name`` is a top-level field of ``tool`` that arrived and validated;
+          ``value`` is its validated value.
+        - "retry": ``attempt`` was rejected and the next one is starting; ``value`` lists
+          the validation errors sent back to the model. Sections emitted earlier in the
+          rejected attempt are superseded by the next attempt's.
+        - "final": ``value`` is the runnable's output, the complete validated AIMessage.
+    """
+
+    kind: Literal["section", "retry", "final"]
+    name: Optional[str]
+    value: Any
+    attempt: int
+    tool: Optional[str] = None
+
+
+class SectionError(ValueError):
+    """A completed top-level section of a streamed tool call failed validation."""
+
+    def __init__(self, section: str, error: ValidationError):
+        super().__init__(f"Section '{section}' failed validation: {error}")
+        self.section = section
+        self.error = error
+
+
+def _validate_section(schema: Optional[Type[BaseModel]], name: str, value: Any) -> Any:
+    if schema is None or name not in schema.model_fields:
+        return value
+    try:
+        # validate_assignment runs the field's type checks and field validators
+        # without requiring the rest of the model to be present.
+        validated = schema.__pydantic_validator__.validate_assignment(
+            schema.model_construct(), name, value
+        )
+    except ValidationError as e:
+        raise SectionError(name, e) from e
+    return getattr(validated, name)
+
+
+def _fragments(chunk: BaseMessage) -> List[Tuple[Hashable, Optional[str], Optional[str], str]]:
+    """``(key, id, name, args)`` of each tool call fragment in a streamed chunk."""
+    if isinstance(chunk, AIMessageChunk):
+        fragments = []
+        for tcc in chunk.tool_call_chunks:
+            # Chunks without an index are not merged with others; each is its own call.
+            key = tcc["index"] if tcc.get("index") is not None else object()
+            fragments.append((key, tcc.get("id"), tcc.get("name"), tcc.get("args") or ""))
+        return fragments
+    # Models without native streaming yield the whole message as their only chunk.
+    return [
+        (i, tc["id"], tc["name"], json.dumps(tc["args"]))
+        for i, tc in enumerate(getattr(chunk, "tool_calls", None) or [])
+    ]
+
+
+class _StreamedCall:
+    """One tool call being streamed: its name, ID and the sections it produced so far."""
+
+    def __init__(self) -> None:
+        self.name: Optional[str] = None
+        self.id: Optional[str] = None
+        self.scanner = TopLevelMemberScanner()
+        self.sections: Dict[str, Any] = {}
+        self.rejected = False
+
+
+class _Generation:
+    """What one streamed generation has produced so far."""
+
+    def __init__(self, schemas: Dict[str, Type[BaseModel]], cut_short: bool = True):
+        self.schemas = schemas
+        self.cut_short = cut_short
+        self.calls: Dict[Hashable, _StreamedCall] = {}
+        self.aggregate: Optional[BaseMessage] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def aborted(self) -> bool:
+        return self.cut_short and self.error is not None
+
+    def feed(self, chunk: BaseMessage) -> List[Tuple[str, str, Any]]:
+        """Add one chunk; returns the ``(tool, section, value)`` it completed and validated."""
+        if self.aggregate is None or not isinstance(chunk, AIMessageChunk):
+            self.aggregate = chunk
+        else:
+            self.aggregate = self.aggregate + chunk
+        completed: List[Tuple[str, str, Any]] = []
+        for key, call_id, name, args in _fragments(chunk):
+            call = self.calls.setdefault(key, _StreamedCall())
+            call.id = call.id or call_id
+            call.name = call.name or name
+            for section, value in call.scanner.feed(args):
+                call.sections[section] = value
+                try:
+                    value = _validate_section(self.schemas.get(call.name), section, value)
+                except SectionError as e:
+                    call.rejected = True
+                    self.error = self.error or e
+                    continue
+                completed.append((call.name, section, value))
+            self.error = self.error or call.scanner.error
+            if self.aborted:
+                break
+        return completed
+
+    def message(self) -> AIMessage:
+        """The generated message; the sections received so far if it was cut short.
+
+        When cut short, a call with a rejected section keeps the sections it sent, so the
+        validator reports the error. Calls that cannot be parsed or were not finished
+        become ``invalid_tool_calls``, as they would if the message had been generated
+        in full, and do not pass validation with their fields missing.
+        """
+        if self.aggregate is None:
+            return AIMessage(content="")
+        if not isinstance(self.aggregate, AIMessageChunk):
+            return self.aggregate
+        if not self.aborted:
+            return message_chunk_to_message(self.aggregate)
+        tool_calls, invalid_tool_calls = [], []
+        for call in self.calls.values():
+            call_id = call.id or str(uuid.uuid4())
+            try:
+                args = json.loads(call.scanner.text)
+            except json.JSONDecodeError as e:
+                if call.rejected and call.scanner.error is None:
+                    args = call.sections
+                else:
+                    error = call.scanner.error or e
+                    invalid_tool_calls.append(
+                        {
+                            "name": call.name,
+                            "args": call.scanner.text,
+                            "id": call_id,
+                            "error": f"Malformed arguments: {error}",
+                            "type": "invalid_tool_call",
+                        }
+                    )
+                    continue
+            tool_calls.append({"name": call.name, "args": args, "id": call_id})
+        return AIMessage(
+            content=self.aggregate.content,
+            tool_calls=tool_calls,
+            invalid_tool_calls=invalid_tool_calls,
+            usage_metadata=self.aggregate.usage_metadata,
+            id=self.aggregate.id,
+        )
+
+
+def _attempt(config: RunnableConfig) -> int:
+    budget = (config.get("configurable") or {}).get("retry_budget") or {}
+    return budget.get("attempt", 1)
+
+
+def _latest_errors(messages: Sequence[BaseMessage]) -> List[str]:
+    """The validation errors sent back about the latest AI message."""
+    errors = []
+    for m in messages[::-1]:
+        if m.type == "ai":
+            break
+        if m.additional_kwargs.get("is_error"):
+            errors.append(str(m.content))
+    return errors[::-1]
+
+
+def announce_retry(messages: Sequence[BaseMessage], config: RunnableConfig) -> None:
+    """Dispatch a ``RETRY_EVENT`` for the attempt whose errors end ``messages``."""
+    data = {"attempt": _attempt(config) - 1, "errors": _latest_errors(messages)}
+    dispatch_custom_event(RETRY_EVENT, data, config=config)
+
+
+async def aannounce_retry(messages: Sequence[BaseMessage], config: RunnableConfig) -> None:
+    data = {"attempt": _attempt(config) - 1, "errors": _latest_errors(messages)}
+    await adispatch_custom_event(RETRY_EVENT, data, config=config)
+
+
+def section_streaming(
+    llm: Runnable, schemas: Dict[str, Type[BaseModel]], *, cut_short: bool = True
+) -> Runnable:
+    """``llm`` streamed, validating each top-level tool argument as soon as it is complete.
+
+    Every section that validates against its tool's schema (looked up by name in
+    ``schemas``) is dispatched as a ``SECTION_EVENT`` custom callback event. The first
+    section that fails closes the provider stream, which cancels the generation, and the
+    message is returned with the sections received so far, so that the validation graph
+    reports the error and retries. With ``cut_short=False`` invalid sections are only left
+    out of the events and the generation runs to the end, for fallbacks that repair the
+    candidate (JSONPatch) rather than regenerate it. The validation graph announces each
+    retry with `announce_retry`.
+
+    `graph.bind_validator_with_retries` applies this with ``stream_sections=True``.
+    """
+
+    def streamed(messages: List[BaseMessage], config: RunnableConfig) -> AIMessage:
+        attempt = _attempt(config)
+        generation = _Generation(schemas, cut_short)
+        # Closing the provider stream on early exit cancels the generation.
+        with contextlib.closing(llm.stream(messages, config)) as chunks:
+            for chunk in chunks:
+                for tool, section, value in generation.feed(chunk):
+                    data = {"tool": tool, "section": section, "value": value, "attempt": attempt}
+                    dispatch_custom_event(SECTION_EVENT, data, config=config)
+                if generation.aborted:
+                    logger.debug(f"Aborting generation on attempt {attempt}: {generation.error!r}")
+                    break
+        return generation.message()
+
+    async def astreamed(messages: List[BaseMessage], config: RunnableConfig) -> AIMessage:
+        attempt = _attempt(config)
+        generation = _Generation(schemas, cut_short)
+        async with contextlib.aclosing(llm.astream(messages, config)) as chunks:
+            async for chunk in chunks:
+                for tool, section, value in generation.feed(chunk):
+                    data = {"tool": tool, "section": section, "value": value, "attempt": attempt}
+                    await adispatch_custom_event(SECTION_EVENT, data, config=config)
+                if generation.aborted:
+                    logger.debug(f"Aborting generation on attempt {attempt}: {generation.error!r}")
+                    break
+        return generation.message()
+
+    return RunnableLambda(streamed, afunc=astreamed, name="SectionStreaming")
+
+
+def _stream_event(name: str, data: Any) -> Optional[StreamEvent]:
+    if name == SECTION_EVENT:
+        return StreamEvent("section", data["section"], data["value"], data["attempt"], data["tool"])
+    if name == RETRY_EVENT:
+        return StreamEvent("retry", None, data["errors"], data["attempt"])
+    return None
+
+
+class _EventCollector(BaseCallbackHandler):
+    # Called on the event loop for async runs, so ``put`` need not be thread-safe there.
+    run_inline = True
+
+    def __init__(self, put: Callable[[Any], None]):
+        self.put = put
+
+    def on_custom_event(self, name: str, data: Any, **kwargs: Any) -> None:
+        event = _stream_event(name, data)
+        if event is not None:
+            self.put(event)
+
+
+Input = Union[Sequence[AnyMessage], PromptValue]
+
+_DONE = object()
+
+
+def stream_sections(
+    runnable: Runnable, input: Input, config: Optional[RunnableConfig] = None
+) -> Iterator[StreamEvent]:
+    """Invoke a validation graph built with ``stream_sections=True``, yielding its events.
+
+    The section and retry events arrive while the graph runs (in a background thread),
+    followed by a single "final" event; a failed extraction raises once its events are
+    consumed. Closing the iterator early does not stop the run; use `astream_sections`
+    to cancel it.
+    """
+    events: "queue.Queue[Any]" = queue.Queue()
+    chain = runnable.with_config(callbacks=[_EventCollector(events.put)])
+
+    def run() -> None:
+        try:
+            events.put((_DONE, chain.invoke(input, config)))
+        except Exception as e:
+            events.put((_DONE, e))
+
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), daemon=True).start()
+    attempt = 1
+    while True:
+        event = events.get()
+        if isinstance(event, StreamEvent):
+            attempt = event.attempt + (event.kind == "retry")
+            yield event
+            continue
+        result = event[1]
+        if isinstance(result, Exception):
+            raise result
+        yield StreamEvent("final", None, result, attempt)
+        return
+
+
+async def astream_sections(
+    runnable: Runnable, input: Input, config: Optional[RunnableConfig] = None
+) -> AsyncIterator[StreamEvent]:
+    """Async counterpart of `stream_sections`; closing the iterator cancels the run."""
+    events: "asyncio.Queue[Any]" = asyncio.Queue()
+    chain = runnable.with_config(callbacks=[_EventCollector(events.put_nowait)])
+
+    async def run() -> None:
+        try:
+            events.put_nowait((_DONE, await chain.ainvoke(input, config)))
+        except Exception as e:
+            events.put_nowait((_DONE, e))
+
+    task = asyncio.ensure_future(run())
+    try:
+        attempt = 1
+        while True:
+            event = await events.get()
+            if isinstance(event, StreamEvent):
+                attempt = event.attempt + (event.kind == "retry")
+                yield event
+                continue
+            result = event[1]
+            if isinstance(result, Exception):
+                raise result
+            yield StreamEvent("final", None, result, attempt)
+            return
+    finally:
+        task.cancel()
+
+
+class StreamingExtractor:
+    """A forced single-tool extractor whose validated sections can be streamed as they arrive.
+
+    A thin wrapper over the validation graph `registry.bind_extractor` builds with
+    ``stream_sections=True``, so the retry strategy, metrics, budgets, salvage and rate
+    limiting all behave as for any other extractor. With the "jsonpatch" strategy only
+    the first attempt is streamed, and it is not cut short at an invalid section, since
+    the patch requests repair it.
+    """
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        tool: Type[BaseModel],
+        *,
+        max_attempts: int = 3,
+        strategy: str = "default",
+        **options: Any,
+    ):
+        from registry import bind_extractor
+
+        self.tool = tool
+        self.runnable = bind_extractor(
+            llm,
+            [tool],
+            tool_choice=tool.__name__,
+            strategy=strategy,
+            max_attempts=max_attempts,
+            stream_sections=True,
+            **options,
+        )
+
+    def stream(self, input: Input, config: Optional[RunnableConfig] = None) -> Iterator[StreamEvent]:
+        return stream_sections(self.runnable, input, config)
+
+    def astream(
+        self, input: Input, config: Optional[RunnableConfig] = None
+    ) -> AsyncIterator[StreamEvent]:
+        return astream_sections(self.runnable, input, config)
+
+    def invoke(self, input: Input, config: Optional[RunnableConfig] = None) -> AIMessage:
+        return self.runnable.invoke(input, config)
+
+    async def ainvoke(self, input: Input, config: Optional[RunnableConfig] = None) -> AIMessage:
+        return await self.runnable.ainvoke(input, config)
+
+
+def bind_streaming_validator(
+    llm: BaseChatModel,
+    *,
+    tool: Type[BaseModel],
+    max_attempts: int = 3,
+    **options: Any,
+) -> StreamingExtractor:
+    """Streaming counterpart of `bind_validator_with_retries` for a single forced tool.
+
+    Use ``.stream(messages)`` / ``.astream(messages)`` to receive validated top-level
+    sections as they arrive. A section that fails validation aborts the generation early
+    and starts the next attempt. ``options`` (``strategy``, ``metrics``, ``salvage``, ...)
+    are passed on to `registry.bind_extractor`.
+    """
+    return StreamingExtractor(llm, tool, max_attempts=max_attempts, **options)
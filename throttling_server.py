@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import collections
+import http.client
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+from ratelimit import estimate_tokens
+
+
+class HTTPStatusError(Exception):
+    """A non-200 response from the stand-in server."""
+
+    def __init__(self, status_code: int, headers: Any, body: bytes):
+        super().__init__(f"HTTP {status_code}: {body[:200]!r}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+class ThrottlingServer:
+    """A local HTTP stand-in for a chat model provider that enforces RPM/TPM limits.
+
+    Each ``POST /v1/chat`` carries the prompt messages; it is answered by ``model``
+    (typically a `scripted_model.ScriptedChatModel`) unless the requests or estimated
+    prompt tokens of the last ``window`` seconds would exceed the limits (scaled from per
+    minute to the window), in which case it gets a 429, with a ``Retry-After`` header when
+    ``send_retry_after`` is set. Connections are kept alive, like a provider's.
+    """
+
+    def __init__(
+        self,
+        model: BaseChatModel,
+        *,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        window: float = 60.0,
+        send_retry_after: bool = True,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.model = model
+        self.max_requests = rpm * window / 60 if rpm else None
+        self.max_tokens = tpm * window / 60 if tpm else None
+        self.window = window
+        self.send_retry_after = send_retry_after
+        self.served = 0
+        self.throttled = 0
+        self._admitted: Deque[Tuple[float, int]] = collections.deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self, tokens: int) -> Optional[float]:
+        """Admit a request of ``tokens``, or return the seconds until it would fit."""
+        with self._lock:
+            now = time.monotonic()
+            while self._admitted and self._admitted[0][0] <= now - self.window:
+                self._admitted.popleft()
+            used = sum(t for _, t in self._admitted)
+            over_requests = self.max_requests is not None and len(self._admitted) + 1 > self.max_requests
+            over_tokens = self.max_tokens is not None and used + tokens > self.max_tokens
+            if not (over_requests or over_tokens):
+                self._admitted.append((now, tokens))
+                self.served += 1
+                return None
+            self.throttled += 1
+            oldest = self._admitted[0][0] if self._admitted else now
+            return max(oldest + self.window - now, 0.0)
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: Any, headers: Sequence[Tuple[str, str]] = ()) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                messages = messages_from_dict(json.loads(self.rfile.read(length))["messages"])
+                wait = server._admit(estimate_tokens(messages))
+                if wait is not None:
+                    headers = [("Retry-After", str(math.ceil(wait)))] if server.send_retry_after else []
+                    self._send(429, {"error": "rate limit exceeded"}, headers)
+                    return
+                self._send(200, message_to_dict(server.model.invoke(messages)))
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "ThrottlingServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ThrottlingServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+class HTTPChatModel(BaseChatModel):
+    """A chat model client for `ThrottlingServer`, with one keep-alive connection per thread.
+
+    Throttled requests raise `HTTPStatusError` (``status_code`` 429, Retry-After in
+    ``headers``) and are not retried here; that is the rate limiter's job.
+    """
+
+    base_url: str
+    timeout: float = 60.0
+
+    _local: threading.local = PrivateAttr(default_factory=threading.local)
+
+    @property
+    def _llm_type(self) -> str:
+        return "http-stand-in"
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        tool_choice: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Runnable:
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            url = urlparse(self.base_url)
+            conn = http.client.HTTPConnection(url.hostname, url.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _post(self, messages: List[BaseMessage]) -> BaseMessage:
+        body = json.dumps({"messages": messages_to_dict(messages)})
+        headers = {"Content-Type": "application/json"}
+        for reconnect in (False, True):
+            conn = self._connection()
+            try:
+                conn.request("POST", "/v1/chat", body, headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the kept-alive connection; open a new one once.
+                conn.close()
+                self._local.conn = None
+                if reconnect:
+                    raise
+        if response.status != 200:
+            raise HTTPStatusError(response.status, response.headers, data)
+        return messages_from_dict([json.loads(data)])[0]
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._post(messages))])
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        return await asyncio.to_thread(self._generate, messages, stop, run_manager, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run extractions against a local throttling stand-in, with and without a rate limiter."
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--rpm", type=float, default=600, help="The server's limit, per minute.")
+    parser.add_argument("--window", type=float, default=6.0, help="The server's window, in seconds.")
+    parser.add_argument("--no-retry-after", action="store_true", help="Send 429s without Retry-After.")
+    args = parser.parse_args(argv)
+
+    from bench import valid_args
+    from graph import bind_validator_with_retries
+    from nested import TranscriptSummary
+    from ratelimit import RateLimiter
+    from scripted_model import ScriptedChatModel, tool_call_message
+
+    model = ScriptedChatModel(script=[tool_call_message(TranscriptSummary.__name__, valid_args(2))])
+    for limited in (False, True):
+        with ThrottlingServer(
+            model, rpm=args.rpm, window=args.window, send_retry_after=not args.no_retry_after
+        ) as server:
+            chain = bind_validator_with_retries(
+                HTTPChatModel(base_url=server.url),
+                tools=[TranscriptSummary],
+                tool_choice=TranscriptSummary.__name__,
+                rate_limiter=RateLimiter(rpm=args.rpm) if limited else None,
+            )
+
+            def extract(_: int) -> bool:
+                # Without the limiter, throttled calls are retried immediately, a few times.
+                for _ in range(1 if limited else 4):
+                    try:
+                        chain.invoke([("user", "Summarize the interview.")])
+                        return True
+                    except HTTPStatusError:
+                        pass
+                return False
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                ok = sum(pool.map(extract, range(args.requests)))
+            print(
+                f"{'rate limited' if limited else 'naive retries'}: {ok}/{args.requests} ok in "
+                f"{time.perf_counter() - start:.1f}s; server sent {server.throttled} 429s"
+            )
+
+
+if __name__ == "__main__":
+    main()
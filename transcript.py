@@ -71,5 +71,13 @@ transcript = [
     ),
 ]
 
-formatted = "\n".join(f"{x[0]}: {x[1]}" for x in transcript)
+
+def __getattr__(name: str):
+    # ``formatted`` is rendered on first access rather than at import time.
+    if name == "formatted":
+        from userTranscript import format_transcript
+
+        value = globals()["formatted"] = format_transcript(transcript)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
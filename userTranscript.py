@@ -71,5 +71,15 @@ transcript = [
     ),
 ]
 
-formatted = "\n".join(f"{x[0]}: {x[1]}" for x in transcript)
+def format_transcript(turns) -> str:
+    """Render ``(speaker, text)`` turns as one ``speaker: text`` line per turn."""
+    return "\n".join(f"{x[0]}: {x[1]}" for x in turns)
+
+
+def __getattr__(name: str):
+    # ``formatted`` is rendered on first access rather than at import time.
+    if name == "formatted":
+        value = globals()["formatted"] = format_transcript(transcript)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 